@@ -1,10 +1,16 @@
 import os
-import requests
 import json
 import logging
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
+import hashlib
 import time
 from datetime import datetime
+from provider_client import ProviderClient, parse_host_pool_sizes
+from cache import ResponseCache, build_cache_backend
+from refresher import BackgroundRefresher
+from singleflight import SingleFlight
+from local_classifier import load_if_available
+import keyword_rules
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -29,10 +35,70 @@ TEXT_GENERATION_MODEL = "accounts/fireworks/models/qwen2p5-72b-instruct"  # New
 SENTIMENT_MODEL = "accounts/fireworks/models/qwen2p5-72b-instruct"  # Use same model for sentiment
 ZERO_SHOT_MODEL = "facebook/bart-large-mnli"  # Keep this as it's working
 
-# Simple cache for API responses to avoid redundant calls (for demo purposes)
-response_cache = {}
+# Shared keep-alive HTTP client for all provider calls, with per-host pool sizes
+# e.g. AI_PROVIDER_POOL_SIZES="router.huggingface.co=16,api-inference.huggingface.co=8"
+provider_client = ProviderClient(
+    default_pool_size=int(os.getenv("AI_PROVIDER_POOL_SIZE", "10")),
+    host_pool_sizes=parse_host_pool_sizes(os.getenv("AI_PROVIDER_POOL_SIZES", ""))
+)
 
-def query_fireworks_ai(prompt: str) -> str:
+# Bounded LRU cache for API responses to avoid redundant calls, with a TTL per result kind.
+# AI_CACHE_BACKEND=sqlite shares results between workers on one host, =redis across hosts.
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", "5000")),
+    max_bytes=int(os.getenv("AI_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttls={
+        "description": float(os.getenv("AI_CACHE_TTL_DESCRIPTION", "86400")),  # 1 day
+        "sentiment": float(os.getenv("AI_CACHE_TTL_SENTIMENT", "604800")),  # 7 days
+        "attributes": float(os.getenv("AI_CACHE_TTL_ATTRIBUTES", "604800"))  # 7 days
+    },
+    backend=build_cache_backend(
+        os.getenv("AI_CACHE_BACKEND", "memory"),
+        sqlite_path=os.getenv("AI_CACHE_SQLITE_PATH", "/tmp/mcp_ai_cache.sqlite3"),
+        redis_url=os.getenv("AI_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    ),
+    # How long past its TTL a result may still be served while it is refreshed in the background
+    stale_windows={
+        "description": float(os.getenv("AI_CACHE_STALE_DESCRIPTION", "604800")),  # 7 days
+        "attributes": float(os.getenv("AI_CACHE_STALE_ATTRIBUTES", "2592000"))  # 30 days
+    }
+)
+
+# Coalesces identical in-flight model calls (same cache key) across concurrent requests
+ai_flights = SingleFlight()
+
+def claim_flights(kind: str, cache_keys: List[str], pending: List[int]) -> Tuple[List[int], Dict]:
+    """
+    Split pending batch indices into ones this call computes (leading) and
+    {index: in-flight call} for keys another caller is already computing.
+    Every leading key must be finished with ai_flights.finish.
+    """
+    leading = []
+    following = {}
+    for index in pending:
+        call, leader = ai_flights.begin(f"{kind}:{cache_keys[index]}")
+        if leader:
+            leading.append(index)
+        else:
+            following[index] = call
+    return leading, following
+
+def wait_for_flight(call):
+    # A failed leader leaves the item unresolved so the caller applies its usual fallback
+    try:
+        return call.wait()
+    except Exception:
+        return None
+
+# Stale-while-revalidate: answer descriptions/attributes right away from the cache (even if stale)
+# or the rule-based fallbacks, and compute the real AI result in the background for the next request
+STALE_WHILE_REVALIDATE = os.getenv("AI_STALE_WHILE_REVALIDATE", "false").lower() == "true"
+refresher = BackgroundRefresher(
+    max_workers=int(os.getenv("AI_REFRESH_WORKERS", "2")),
+    max_pending=int(os.getenv("AI_REFRESH_MAX_PENDING", "1000"))
+)
+
+def query_fireworks_ai(prompt: str, timeout: float = 15) -> str:
     """
     Query the Fireworks AI model via Hugging Face.
     """
@@ -49,11 +115,11 @@ def query_fireworks_ai(prompt: str) -> str:
             "model": TEXT_GENERATION_MODEL
         }
         
-        response = requests.post(
+        response = provider_client.post(
             FIREWORKS_API_URL,
             headers=headers,
             json=payload,
-            timeout=15
+            timeout=timeout
         )
         
         logger.info(f"Fireworks AI response status: {response.status_code}")
@@ -74,84 +140,178 @@ def query_fireworks_ai(prompt: str) -> str:
         logger.error(f"Error querying Fireworks AI: {str(e)}")
         return ""
 
-def generate_personalized_description(dish_name: str, cuisine: str, user_preferences: Dict) -> str:
+# Prompt for personalized dish descriptions; only the cuisine and dietary focus vary per user
+DESCRIPTION_PROMPT_TEMPLATE = """Write a delicious and appealing description of the {cuisine} dish '{dish_name}' 
+for someone who follows {dietary_focus}. Focus on flavors, ingredients, and what makes this dish special.
+Keep the description between 40-60 words and make it mouth-watering."""
+
+def build_description_prompt(dish_name: str, cuisine: str, dietary_restrictions: List[str]) -> str:
+    """
+    Fill the description prompt template for a dish and a set of dietary restrictions.
+    """
+    dietary_focus = ", ".join(dietary_restrictions)
+    if not dietary_focus:
+        dietary_focus = "any diet"
+    return DESCRIPTION_PROMPT_TEMPLATE.format(cuisine=cuisine, dish_name=dish_name, dietary_focus=dietary_focus)
+
+def description_cache_key(dish_name: str, cuisine: str, user_preferences: Dict) -> str:
+    return f"desc_{dish_name}_{cuisine}_{json.dumps(user_preferences, sort_keys=True)}"
+
+def fallback_description(dish_name: str, cuisine: str) -> str:
+    """
+    Hand-written description for well-known dishes, or a generic one for the cuisine.
+    """
+    custom_descriptions = {
+        # Italian dishes
+        "Margherita Pizza": f"A classic {cuisine} pizza topped with fresh tomatoes, mozzarella, basil, and a drizzle of olive oil. Simple yet delicious!",
+        "Spaghetti Carbonara": f"A rich {cuisine} pasta dish made with eggs, cheese, pancetta, and black pepper. Creamy and satisfying!",
+        "Lasagna": f"Layers of pasta, rich meat sauce, and creamy cheese make this {cuisine} classic a hearty favorite.",
+        "Tiramisu": f"A delightful {cuisine} dessert with layers of coffee-soaked ladyfingers and mascarpone cream.",
+        
+        # Indian dishes
+        "Chicken Tikka Masala": f"Tender chicken in a creamy, aromatic {cuisine} sauce with a blend of warming spices.",
+        "Vegetable Biryani": f"Fragrant basmati rice cooked with mixed vegetables and {cuisine} spices for a flavorful experience.",
+        "Butter Chicken": f"A rich and creamy {cuisine} curry with tender chicken pieces in a tomato-based sauce.",
+        "Chana Masala": f"A robust {cuisine} chickpea curry with a blend of spices that create a deeply satisfying flavor.",
+        
+        # Mexican dishes
+        "Carne Asada Taco": f"Grilled, marinated steak served in a soft tortilla with fresh toppings - a {cuisine} favorite.",
+        "Veggie Burrito": f"A hearty {cuisine} wrap filled with seasoned beans, rice, and fresh vegetables.",
+        
+        # Thai dishes
+        "Pad Thai": f"Stir-fried rice noodles with a perfect balance of sweet, sour, and savory flavors - a {cuisine} classic.",
+        "Green Curry": f"A fragrant {cuisine} curry with coconut milk, vegetables, and aromatic herbs and spices."
+    }
+    
+    # Check if we have a custom description for this dish
+    if dish_name in custom_descriptions:
+        return custom_descriptions[dish_name]
+    
+    # Generic fallback based on cuisine
+    cuisine_descriptions = {
+        "Italian": "A classic Italian dish with rich flavors and quality ingredients - a taste of authentic Italy.",
+        "Indian": "A flavorful Indian dish with aromatic spices and complex flavors that dance on your palate.",
+        "Mexican": "A vibrant Mexican dish combining fresh ingredients with bold, zesty flavors.",
+        "Thai": "A harmonious Thai dish balancing sweet, sour, salty, and spicy elements.",
+        "Chinese": "A well-crafted Chinese dish with layers of flavor and expert preparation techniques.",
+        "Japanese": "A precise Japanese dish showcasing balance, freshness, and skilled craftsmanship.",
+        "Vegan": "A satisfying plant-based dish packed with nutrients and bright flavors."
+    }
+    return cuisine_descriptions.get(cuisine, f"A delicious {cuisine} dish with wonderful flavors and textures.")
+
+def serve_while_revalidating(kind: str, cache_key: str, refresh, fallback):
+    """
+    Stale-while-revalidate lookup: return the cached value for (kind, cache_key),
+    even if stale, or fallback() when there is none, without waiting on a model.
+    A stale or missing value is recomputed by refresh() in the background, which
+    is expected to store its result in response_cache.
+    """
+    entry = response_cache.get_stale(kind, cache_key)
+    if entry is not None and entry[1]:
+        return entry[0]
+    refresher.submit(f"{kind}:{cache_key}", refresh)
+    if entry is not None:
+        logger.info(f"Serving stale {kind} while it is refreshed")
+        return entry[0]
+    return fallback()
+
+def serve_batch_while_revalidating(kind: str, items: List[Dict], cache_keys: List[str], refresh_batch, fallback) -> List:
+    """
+    Batch form of serve_while_revalidating: results line up with items, and a
+    single background refresh_batch(stale_items) call covers every stale or
+    missing item that is not already being refreshed.
+    """
+    results = []
+    stale_keys = []
+    stale_items = []
+    for item, cache_key in zip(items, cache_keys):
+        entry = response_cache.get_stale(kind, cache_key)
+        results.append(entry[0] if entry is not None else fallback(item))
+        if entry is None or not entry[1]:
+            stale_keys.append(f"{kind}:{cache_key}")
+            stale_items.append(item)
+    
+    claimed = refresher.claim(stale_keys)
+    if claimed:
+        claimed_keys = set(claimed)
+        refresh_items = [item for key, item in zip(stale_keys, stale_items) if key in claimed_keys]
+        logger.info(f"Refreshing {len(refresh_items)} {kind} result(s) in the background")
+        refresher.run(claimed, refresh_batch, refresh_items)
+    return results
+
+def _refresh_description(dish_name: str, cuisine: str, user_preferences: Dict):
+    # Background job: only a real model result is cached, so a failed refresh is retried next time
+    prompt = build_description_prompt(dish_name, cuisine, user_preferences.get("dietary_restrictions", []))
+    generated_text = query_fireworks_ai(prompt)
+    if generated_text and len(generated_text) > 20:
+        response_cache.set("description", description_cache_key(dish_name, cuisine, user_preferences), generated_text)
+
+def _refresh_descriptions(dishes: List[Dict], user_preferences: Dict):
+    # Background job: one batched completion, then the single-dish call for any dish the batch
+    # skipped, as the synchronous path does; otherwise such a dish would be served the fallback forever
+    descriptions = generate_personalized_descriptions_batch(dishes, user_preferences, stale_while_revalidate=False)
+    for dish, description in zip(dishes, descriptions):
+        if description is None:
+            _refresh_description(dish["name"], dish["cuisine"], user_preferences)
+
+def generate_personalized_description(
+    dish_name: str,
+    cuisine: str,
+    user_preferences: Dict,
+    stale_while_revalidate: Optional[bool] = None
+) -> str:
     """
     Generate a personalized description for a dish based on user preferences.
+    With stale_while_revalidate (default AI_STALE_WHILE_REVALIDATE) a cache miss
+    returns the fallback description immediately and generates in the background.
     """
     # Create a cache key for this request
-    cache_key = f"desc_{dish_name}_{cuisine}_{json.dumps(user_preferences)}"
-    if cache_key in response_cache:
+    cache_key = description_cache_key(dish_name, cuisine, user_preferences)
+    if STALE_WHILE_REVALIDATE if stale_while_revalidate is None else stale_while_revalidate:
+        return serve_while_revalidating(
+            "description",
+            cache_key,
+            lambda: _refresh_description(dish_name, cuisine, user_preferences),
+            lambda: fallback_description(dish_name, cuisine)
+        )
+    
+    cached_result = response_cache.get("description", cache_key)
+    if cached_result is not None:
         logger.info(f"Using cached description for {dish_name}")
-        cached_result = response_cache[cache_key]
         logger.info(f"AI OUTPUT (cached): {cached_result}")
         return cached_result
     
+    # Concurrent misses for the same dish and preferences share one Fireworks call
+    description = ai_flights.do(f"description:{cache_key}", _generate_description, dish_name, cuisine, user_preferences, cache_key)
+    if description is None:
+        # Shared from a batched call that could not describe this dish
+        description = _generate_description(dish_name, cuisine, user_preferences, cache_key)
+    return description
+
+def _generate_description(dish_name: str, cuisine: str, user_preferences: Dict, cache_key: str) -> str:
     try:
         # Create prompt that incorporates user preferences
-        dietary_focus = ", ".join(user_preferences.get("dietary_restrictions", []))
-        if not dietary_focus:
-            dietary_focus = "any diet"
-        
-        # Create a prompt for the Fireworks AI model
-        prompt = f"""Write a delicious and appealing description of the {cuisine} dish '{dish_name}' 
-for someone who follows {dietary_focus}. Focus on flavors, ingredients, and what makes this dish special.
-Keep the description between 40-60 words and make it mouth-watering."""
+        prompt = build_description_prompt(dish_name, cuisine, user_preferences.get("dietary_restrictions", []))
         
         # Try with Fireworks AI
         generated_text = query_fireworks_ai(prompt)
         
         if generated_text and len(generated_text) > 20:
             logger.info(f"Generated description with Fireworks AI: {generated_text[:50]}...")
-            response_cache[cache_key] = generated_text
+            response_cache.set("description", cache_key, generated_text)
             return generated_text
         
         # If Fireworks AI fails, go straight to the custom fallbacks
         logger.warning("Fireworks AI failed, using custom fallback descriptions")
         
         # If we get here, use fallback descriptions
-        custom_descriptions = {
-            # Italian dishes
-            "Margherita Pizza": f"A classic {cuisine} pizza topped with fresh tomatoes, mozzarella, basil, and a drizzle of olive oil. Simple yet delicious!",
-            "Spaghetti Carbonara": f"A rich {cuisine} pasta dish made with eggs, cheese, pancetta, and black pepper. Creamy and satisfying!",
-            "Lasagna": f"Layers of pasta, rich meat sauce, and creamy cheese make this {cuisine} classic a hearty favorite.",
-            "Tiramisu": f"A delightful {cuisine} dessert with layers of coffee-soaked ladyfingers and mascarpone cream.",
-            
-            # Indian dishes
-            "Chicken Tikka Masala": f"Tender chicken in a creamy, aromatic {cuisine} sauce with a blend of warming spices.",
-            "Vegetable Biryani": f"Fragrant basmati rice cooked with mixed vegetables and {cuisine} spices for a flavorful experience.",
-            "Butter Chicken": f"A rich and creamy {cuisine} curry with tender chicken pieces in a tomato-based sauce.",
-            "Chana Masala": f"A robust {cuisine} chickpea curry with a blend of spices that create a deeply satisfying flavor.",
-            
-            # Mexican dishes
-            "Carne Asada Taco": f"Grilled, marinated steak served in a soft tortilla with fresh toppings - a {cuisine} favorite.",
-            "Veggie Burrito": f"A hearty {cuisine} wrap filled with seasoned beans, rice, and fresh vegetables.",
-            
-            # Thai dishes
-            "Pad Thai": f"Stir-fried rice noodles with a perfect balance of sweet, sour, and savory flavors - a {cuisine} classic.",
-            "Green Curry": f"A fragrant {cuisine} curry with coconut milk, vegetables, and aromatic herbs and spices."
-        }
-        
-        # Check if we have a custom description for this dish
-        if dish_name in custom_descriptions:
-            description = custom_descriptions[dish_name]
-        else:
-            # Generic fallback based on cuisine
-            cuisine_descriptions = {
-                "Italian": "A classic Italian dish with rich flavors and quality ingredients - a taste of authentic Italy.",
-                "Indian": "A flavorful Indian dish with aromatic spices and complex flavors that dance on your palate.",
-                "Mexican": "A vibrant Mexican dish combining fresh ingredients with bold, zesty flavors.",
-                "Thai": "A harmonious Thai dish balancing sweet, sour, salty, and spicy elements.",
-                "Chinese": "A well-crafted Chinese dish with layers of flavor and expert preparation techniques.",
-                "Japanese": "A precise Japanese dish showcasing balance, freshness, and skilled craftsmanship.",
-                "Vegan": "A satisfying plant-based dish packed with nutrients and bright flavors."
-            }
-            description = cuisine_descriptions.get(cuisine, f"A delicious {cuisine} dish with wonderful flavors and textures.")
+        description = fallback_description(dish_name, cuisine)
         
         logger.info(f"Using fallback description for {dish_name}")
         logger.info(f"AI OUTPUT (fallback): {description}")
         
         # Cache the fallback result too
-        response_cache[cache_key] = description
+        response_cache.set("description", cache_key, description)
         return description
     
     except Exception as e:
@@ -160,18 +320,145 @@ Keep the description between 40-60 words and make it mouth-watering."""
         logger.info(f"AI OUTPUT (error fallback): {fallback}")
         return fallback
 
+# Instructions sent once per batched description request
+BATCH_DESCRIPTION_PROMPT_TEMPLATE = """Write a delicious and appealing description for each of the dishes below,
+for someone who follows {dietary_focus}. Focus on flavors, ingredients, and what makes each dish special.
+Keep each description between 40-60 words and make it mouth-watering.
+
+Dishes (JSON):
+{dishes_json}
+
+Respond with only a JSON array, one object per dish, in this format:
+[{{"id": 0, "description": "..."}}, {{"id": 1, "description": "..."}}]
+"""
+
+# Default number of dishes described per batched completion
+DESCRIPTION_BATCH_SIZE = int(os.getenv("AI_DESCRIPTION_BATCH_SIZE", "10"))
+
+def _parse_json_payload(text: str):
+    # Models often wrap JSON in markdown code fences or add a sentence around it
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.lower().startswith("json"):
+            text = text[4:]
+    start = min([i for i in (text.find("["), text.find("{")) if i >= 0], default=-1)
+    if start < 0:
+        raise ValueError("No JSON found in model output")
+    decoder = json.JSONDecoder()
+    payload, _ = decoder.raw_decode(text[start:])
+    return payload
+
+def generate_personalized_descriptions_batch(
+    dishes: List[Dict],
+    user_preferences: Dict,
+    stale_while_revalidate: Optional[bool] = None
+) -> List[Optional[str]]:
+    """
+    Generate descriptions for several dishes ({"name", "cuisine"}) with one completion per batch.
+
+    Results line up with the input list. Cached items are served from the cache;
+    items the model skipped or returned in an invalid shape come back as None so
+    the caller can fall back to generate_personalized_description for them.
+    With stale_while_revalidate every item is answered immediately (cached or
+    fallback text) and missing ones are generated in one background batch.
+    """
+    if STALE_WHILE_REVALIDATE if stale_while_revalidate is None else stale_while_revalidate:
+        return serve_batch_while_revalidating(
+            "description",
+            dishes,
+            [description_cache_key(dish["name"], dish["cuisine"], user_preferences) for dish in dishes],
+            lambda stale: _refresh_descriptions(stale, user_preferences),
+            lambda dish: fallback_description(dish["name"], dish["cuisine"])
+        )
+    
+    results: List[Optional[str]] = [None] * len(dishes)
+    cache_keys = [description_cache_key(dish["name"], dish["cuisine"], user_preferences) for dish in dishes]
+    pending = []
+    for index, cache_key in enumerate(cache_keys):
+        cached_result = response_cache.get("description", cache_key)
+        if cached_result is not None:
+            results[index] = cached_result
+        else:
+            pending.append(index)
+    
+    # Dishes another request is already generating are awaited instead of requested again
+    leading, following = claim_flights("description", cache_keys, pending)
+    if leading:
+        logger.info(f"Batch-describing {len(leading)} dishes ({len(dishes) - len(pending)} cached, {len(following)} in flight)")
+    try:
+        _describe_dish_chunks(dishes, leading, user_preferences, cache_keys, results)
+    finally:
+        for index in leading:
+            ai_flights.finish(f"description:{cache_keys[index]}", results[index])
+    for index, call in following.items():
+        results[index] = wait_for_flight(call)
+    
+    return results
+
+def _describe_dish_chunks(dishes: List[Dict], pending: List[int], user_preferences: Dict, cache_keys: List[str], results: List[Optional[str]]):
+    # Fill results[index] for every pending index that the model described validly
+    dietary_focus = ", ".join(user_preferences.get("dietary_restrictions", [])) or "any diet"
+    for start in range(0, len(pending), max(1, DESCRIPTION_BATCH_SIZE)):
+        chunk = pending[start:start + max(1, DESCRIPTION_BATCH_SIZE)]
+        items = [
+            {"id": position, "dish": dishes[index]["name"], "cuisine": dishes[index]["cuisine"]}
+            for position, index in enumerate(chunk)
+        ]
+        prompt = BATCH_DESCRIPTION_PROMPT_TEMPLATE.format(
+            dietary_focus=dietary_focus,
+            dishes_json=json.dumps(items)
+        )
+        
+        # Longer timeout than the single-dish call since the completion covers the whole chunk
+        generated_text = query_fireworks_ai(prompt, timeout=15 + 3 * len(chunk))
+        if not generated_text:
+            continue
+        
+        try:
+            payload = _parse_json_payload(generated_text)
+        except ValueError as e:
+            logger.warning(f"Could not parse batched descriptions: {e}")
+            continue
+        if isinstance(payload, dict):
+            payload = payload.get("descriptions", [])
+        if not isinstance(payload, list):
+            continue
+        
+        # Validate each item on its own so one bad entry does not discard the batch
+        for item in payload:
+            if not isinstance(item, dict):
+                continue
+            position = item.get("id")
+            description = item.get("description")
+            if not isinstance(position, int) or not 0 <= position < len(chunk):
+                continue
+            if not isinstance(description, str) or len(description.strip()) <= 20:
+                continue
+            index = chunk[position]
+            results[index] = description.strip()
+            response_cache.set("description", cache_keys[index], results[index])
+        
+        missing = sum(1 for index in chunk if results[index] is None)
+        if missing:
+            logger.warning(f"{missing} of {len(chunk)} batched descriptions were missing or invalid")
+
 def analyze_feedback_sentiment(feedback_text: str) -> Dict:
     """
     Analyze the sentiment of user feedback with detailed confidence and explanation.
     """
     # Create a cache key for this request
     cache_key = f"sentiment_{feedback_text}"
-    if cache_key in response_cache:
+    cached_result = response_cache.get("sentiment", cache_key)
+    if cached_result is not None:
         logger.info(f"Using cached sentiment analysis")
-        cached_result = response_cache[cache_key]
         logger.info(f"AI OUTPUT (cached sentiment): {json.dumps(cached_result)}")
         return cached_result
     
+    # Identical feedback submitted concurrently is analyzed once
+    return ai_flights.do(f"sentiment:{cache_key}", _analyze_feedback_sentiment, feedback_text, cache_key)
+
+def _analyze_feedback_sentiment(feedback_text: str, cache_key: str) -> Dict:
     try:
         # First try with Fireworks AI - use a more detailed prompt to get confidence and reasoning
         prompt = f"""Analyze the sentiment of this food feedback text: "{feedback_text}"
@@ -223,7 +510,7 @@ Example response format:
                         logger.info(f"AI OUTPUT (detailed sentiment): {json.dumps(sentiment_result)}")
                         
                         # Cache the result
-                        response_cache[cache_key] = sentiment_result
+                        response_cache.set("sentiment", cache_key, sentiment_result)
                         return sentiment_result
             except json.JSONDecodeError:
                 # If JSON parsing fails, try to extract just the sentiment
@@ -258,7 +545,7 @@ Example response format:
             logger.info(f"AI OUTPUT (simple sentiment): {json.dumps(sentiment_result)}")
             
             # Cache the result
-            response_cache[cache_key] = sentiment_result
+            response_cache.set("sentiment", cache_key, sentiment_result)
             return sentiment_result
         
         logger.warning("Fireworks AI sentiment analysis failed, trying fallback methods")
@@ -267,7 +554,7 @@ Example response format:
         backup_model = "distilbert-base-uncased-sentiment"
         logger.info(f"Primary sentiment model failed, trying backup: {backup_model}")
         
-        response = requests.post(
+        response = provider_client.post(
             f"{HF_API_URL}/{backup_model}",
             headers=headers,
             json={"inputs": feedback_text},
@@ -292,21 +579,17 @@ Example response format:
                 }
                 
                 # Cache the result
-                response_cache[cache_key] = sentiment_result
+                response_cache.set("sentiment", cache_key, sentiment_result)
                 return sentiment_result
         
         # Fallback response based on keyword analysis
         logger.warning("Using keyword fallback for sentiment analysis")
-        positive_keywords = ["good", "great", "love", "delicious", "tasty", "amazing", "excellent", "enjoy", "best", "favorite"]
-        negative_keywords = ["bad", "awful", "terrible", "worst", "dislike", "hate", "disgusting", "disappointed", "poor", "mediocre"]
-        
-        feedback_lower = feedback_text.lower()
-        positive_count = sum(1 for word in positive_keywords if word in feedback_lower)
-        negative_count = sum(1 for word in negative_keywords if word in feedback_lower)
-        
-        # Find actual matching keywords for details
-        matched_positive = [word for word in positive_keywords if word in feedback_lower]
-        matched_negative = [word for word in negative_keywords if word in feedback_lower]
+        # One pass over the text with the precompiled sentiment matcher
+        hits = keyword_rules.SENTIMENT_MATCHER.find_all(feedback_text)
+        matched_positive = hits.get("positive", [])
+        matched_negative = hits.get("negative", [])
+        positive_count = len(matched_positive)
+        negative_count = len(matched_negative)
         
         if positive_count > negative_count:
             sentiment_result = {
@@ -342,7 +625,7 @@ Example response format:
         logger.info(f"AI OUTPUT (keyword sentiment): {json.dumps(sentiment_result)}")
         
         # Cache the fallback result too
-        response_cache[cache_key] = sentiment_result
+        response_cache.set("sentiment", cache_key, sentiment_result)
         return sentiment_result
     
     except Exception as e:
@@ -351,171 +634,425 @@ Example response format:
         logger.info(f"AI OUTPUT (error fallback): {json.dumps(fallback_result)}")
         return fallback_result
 
-def classify_dish_attributes(dish_name: str, dish_description: str) -> List[str]:
+# Instructions sent once per batched sentiment request
+BATCH_SENTIMENT_PROMPT_TEMPLATE = """Analyze the sentiment of each food feedback text below.
+
+Feedback (JSON):
+{feedback_json}
+
+Respond with only a JSON array, one object per feedback, in this format:
+[{{"id": 0, "sentiment": "POSITIVE", "confidence": 0.85, "reasoning": "...", "key_phrases": ["..."]}}]
+sentiment is "POSITIVE", "NEGATIVE" or "NEUTRAL", confidence is between 0.0 and 1.0,
+and key_phrases holds up to 3 phrases from the text that influenced your decision.
+"""
+
+# Default number of feedback texts analyzed per batched completion
+SENTIMENT_BATCH_SIZE = int(os.getenv("AI_SENTIMENT_BATCH_SIZE", "16"))
+
+def analyze_feedback_sentiment_batch(feedback_texts: List[str]) -> List[Dict]:
     """
-    Classify a dish into different attribute categories using zero-shot classification.
+    Analyze several feedback texts with one Fireworks completion per batch.
+
+    Results line up with the input list and have the same shape as
+    analyze_feedback_sentiment; texts the model skipped or answered in an
+    invalid shape go through analyze_feedback_sentiment and its fallbacks.
     """
-    # Create a cache key for this request
-    cache_key = f"attr_{dish_name}"
-    if cache_key in response_cache:
-        logger.info(f"Using cached attributes for {dish_name}")
-        return response_cache[cache_key]
+    results: List[Optional[Dict]] = [None] * len(feedback_texts)
+    pending = []
+    for index, feedback_text in enumerate(feedback_texts):
+        cached_result = response_cache.get("sentiment", f"sentiment_{feedback_text}")
+        if cached_result is not None:
+            results[index] = cached_result
+        else:
+            pending.append(index)
     
-    try:
-        # Combine name and description
-        input_text = f"{dish_name}: {dish_description}"
-        
-        # Define the categories we want to classify for
-        categories = ["spicy", "sweet", "savory", "healthy", "comfort food", "light", "rich", "exotic", "traditional"]
+    batch_size = max(1, SENTIMENT_BATCH_SIZE)
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        if len(chunk) == 1:
+            break
+        items = [{"id": position, "text": feedback_texts[index]} for position, index in enumerate(chunk)]
+        logger.info(f"Batch-analyzing sentiment of {len(chunk)} feedback texts")
+        generated_text = query_fireworks_ai(
+            BATCH_SENTIMENT_PROMPT_TEMPLATE.format(feedback_json=json.dumps(items)),
+            timeout=15 + len(chunk)
+        )
+        if not generated_text:
+            continue
         
-        logger.info(f"Classifying dish attributes for: {dish_name}")
-        logger.info(f"Using model: {ZERO_SHOT_MODEL}")
+        try:
+            payload = _parse_json_payload(generated_text)
+        except ValueError as e:
+            logger.warning(f"Could not parse batched sentiment: {e}")
+            continue
+        if not isinstance(payload, list):
+            continue
         
+        # Validate each item on its own so one bad entry does not discard the batch
+        for item in payload:
+            if not isinstance(item, dict) or not isinstance(item.get("id"), int) or not 0 <= item["id"] < len(chunk):
+                continue
+            sentiment = str(item.get("sentiment", "")).strip().upper()
+            if sentiment not in ["POSITIVE", "NEGATIVE", "NEUTRAL"]:
+                continue
+            try:
+                confidence = max(0.0, min(1.0, float(item.get("confidence", 0.7))))
+            except (TypeError, ValueError):
+                confidence = 0.7
+            
+            index = chunk[item["id"]]
+            results[index] = {
+                "sentiment": sentiment,
+                "confidence": confidence,
+                "details": {
+                    "reasoning": item.get("reasoning", ""),
+                    "key_phrases": item.get("key_phrases", []),
+                    "analysis_method": "AI semantic understanding"
+                }
+            }
+            response_cache.set("sentiment", f"sentiment_{feedback_texts[index]}", results[index])
+    
+    # Anything left (single texts, model errors, invalid items) takes the single-text path
+    for index in range(len(feedback_texts)):
+        if results[index] is None:
+            results[index] = analyze_feedback_sentiment(feedback_texts[index])
+    return results
+
+# Candidate labels for zero-shot dish classification
+ATTRIBUTE_CATEGORIES = ["spicy", "sweet", "savory", "healthy", "comfort food", "light", "rich", "exotic", "traditional"]
+
+# Minimum zero-shot score for a label to count as an attribute
+ATTRIBUTE_SCORE_THRESHOLD = 0.3
+
+# More descriptive terms for each label, for better UI display
+ATTRIBUTE_DESCRIPTORS = {
+    "spicy": "Spicy & Aromatic",
+    "sweet": "Sweet & Indulgent",
+    "savory": "Rich & Savory",
+    "healthy": "Nutritious & Healthy",
+    "comfort food": "Comforting & Satisfying",
+    "light": "Light & Fresh",
+    "rich": "Rich & Flavorful",
+    "exotic": "Exotic & Unique",
+    "traditional": "Traditional & Authentic"
+}
+
+# Attribute classification mode:
+#   remote - zero-shot model only (default)
+#   local  - in-process classifier only (see local_classifier.py)
+#   hybrid - in-process classifier first, zero-shot model for low-confidence dishes
+ATTRIBUTE_MODE = os.getenv("AI_ATTRIBUTE_MODE", "remote").lower()
+LOCAL_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("AI_LOCAL_CLASSIFIER_MIN_CONFIDENCE", "0.3"))
+local_classifier = load_if_available(os.getenv("AI_LOCAL_CLASSIFIER_PATH", "local_attribute_model.npz")) if ATTRIBUTE_MODE != "remote" else None
+
+def describe_attribute_scores(
+    labels: List[str],
+    scores: List[float],
+    dish_name: str,
+    dish_description: str,
+    threshold: float = ATTRIBUTE_SCORE_THRESHOLD
+) -> List[str]:
+    """
+    Turn zero-shot label scores into up to 3 display attributes, or [] if no label is confident enough.
+    """
+    # Pair labels with scores, sort by score in descending order
+    label_scores = list(zip(labels, scores))
+    label_scores.sort(key=lambda x: x[1], reverse=True)
+    
+    # Take top 3 categories with scores above threshold
+    top_categories = [label for label, score in label_scores if score > threshold][:3]
+    if not top_categories:
+        return []
+    
+    logger.info(f"Identified attributes: {top_categories}")
+    final_attributes = [ATTRIBUTE_DESCRIPTORS.get(attr, attr.capitalize()) for attr in top_categories]
+    logger.info(f"Identified attributes with descriptors: {final_attributes}")
+    
+    # Ensure we have at least 2-3 attributes for a better UI display
+    if len(final_attributes) < 2:
+        if "Indian" in dish_description or "Indian" in dish_name:
+            final_attributes.append("Aromatic Spices")
+        elif "Italian" in dish_description or "Italian" in dish_name:
+            final_attributes.append("Mediterranean Inspired")
+        elif "Chinese" in dish_description or "Chinese" in dish_name:
+            final_attributes.append("Asian Flavors")
+        elif "vegetarian" in dish_description.lower() or "vegan" in dish_description.lower():
+            final_attributes.append("Plant-Based Goodness")
+    
+    return final_attributes[:3]  # Limit to top 3 for clean UI
+
+# Default number of dishes classified per zero-shot request
+ATTRIBUTE_BATCH_SIZE = int(os.getenv("AI_ATTRIBUTE_BATCH_SIZE", "32"))
+
+def _post_zero_shot(inputs: Union[str, List[str]], timeout: float = 10):
+    """
+    Send one zero-shot request for a text or a list of texts; returns the parsed JSON or None on failure.
+    """
+    try:
         # Improve the request format to better leverage the zero-shot model
-        response = requests.post(
+        response = provider_client.post(
             f"{HF_API_URL}/{ZERO_SHOT_MODEL}",
             headers=headers,
             json={
-                "inputs": input_text,
+                "inputs": inputs,
                 "parameters": {
-                    "candidate_labels": categories,
+                    "candidate_labels": ATTRIBUTE_CATEGORIES,
                     "multi_label": True  # Allow multiple labels
                 }
             },
-            timeout=10  # Add timeout
+            timeout=timeout  # Add timeout
         )
+    except Exception as e:
+        logger.error(f"Error querying zero-shot model: {str(e)}")
+        return None
+    
+    logger.info(f"Dish classification response status: {response.status_code}")
+    if response.status_code != 200:
+        return None
+    try:
+        return response.json()
+    except ValueError:
+        return None
+
+def zero_shot_dish_attributes(dish_name: str, dish_description: str) -> Optional[List[str]]:
+    """
+    Classify a dish with the zero-shot model only.
+    Returns None if the model call failed, [] if no label was confident enough.
+    """
+    # Combine name and description
+    input_text = f"{dish_name}: {dish_description}"
+    
+    logger.info(f"Classifying dish attributes for: {dish_name}")
+    logger.info(f"Using model: {ZERO_SHOT_MODEL}")
+    
+    result = _post_zero_shot(input_text)
+    if result is None:
+        return None
+    # A single input may come back as a one-element list
+    if isinstance(result, list) and len(result) == 1:
+        result = result[0]
+    if isinstance(result, dict) and "labels" in result and "scores" in result:
+        return describe_attribute_scores(result["labels"], result["scores"], dish_name, dish_description)
+    return []
+
+def local_dish_attributes(dishes: List[Dict]) -> List[Tuple[List[str], float]]:
+    """
+    Score a batch of dishes ({"name", "description"}) with the in-process classifier.
+    Returns (attributes, confidence) per dish; requires local_classifier to be loaded.
+    """
+    texts = [f"{dish['name']}: {dish['description'] or ''}" for dish in dishes]
+    probabilities, confidence = local_classifier.predict(texts)
+    results = []
+    for dish, dish_probabilities, dish_confidence in zip(dishes, probabilities, confidence):
+        attributes = describe_attribute_scores(
+            local_classifier.labels,
+            dish_probabilities.tolist(),
+            dish["name"],
+            dish["description"] or "",
+            threshold=0.5
+        )
+        if not attributes:
+            attributes = keyword_dish_attributes(dish["name"], dish["description"] or "")
+        results.append((attributes, float(dish_confidence)))
+    return results
+
+def keyword_dish_attributes(dish_name: str, dish_description: str) -> List[str]:
+    """
+    Rules-based dish attributes from keywords in the dish name and description.
+    """
+    attributes = []
+    input_text = f"{dish_name}: {dish_description}"
+    
+    # Add cuisine-specific attributes when the cuisine is named in the dish text
+    for cuisine in keyword_rules.CUISINE_MATCHER.categories(input_text):
+        attributes.extend(keyword_rules.CUISINE_ATTRIBUTES[cuisine])
+    
+    # Text-based analysis for additional attributes (single pass over all categories)
+    for category in keyword_rules.ATTRIBUTE_MATCHER.categories(input_text):
+        if category not in attributes:
+            attributes.append(category)
+    
+    # Add dish-specific attributes
+    attributes.extend(keyword_rules.first_rule_attributes(
+        keyword_rules.DISH_NAME_MATCHER, keyword_rules.DISH_NAME_RULES, dish_name
+    ))
+    
+    # Remove duplicates (keeping order) and limit to top 3
+    attributes = list(dict.fromkeys(attributes))[:3]
+    
+    logger.info(f"Identified attributes using keywords: {attributes}")
+    
+    # If we still have no attributes, add generic ones based on dish name
+    if not attributes:
+        attributes = keyword_rules.first_rule_attributes(
+            keyword_rules.GENERIC_NAME_MATCHER, keyword_rules.GENERIC_NAME_RULES, dish_name
+        ) or ["tasty", "flavorful"]
+    
+    return attributes
+
+def classify_dish_attributes(
+    dish_name: str,
+    dish_description: str,
+    stale_while_revalidate: Optional[bool] = None
+) -> List[str]:
+    """
+    Classify a dish into different attribute categories using zero-shot classification.
+    With stale_while_revalidate (default AI_STALE_WHILE_REVALIDATE) a cache miss
+    returns keyword-based attributes immediately and classifies in the background.
+    """
+    # Create a cache key for this request
+    cache_key = f"attr_{dish_name}"
+    if STALE_WHILE_REVALIDATE if stale_while_revalidate is None else stale_while_revalidate:
+        return serve_while_revalidating(
+            "attributes",
+            cache_key,
+            lambda: classify_dish_attributes(dish_name, dish_description, stale_while_revalidate=False),
+            lambda: keyword_dish_attributes(dish_name, dish_description)
+        )
+    
+    cached_result = response_cache.get("attributes", cache_key)
+    if cached_result is not None:
+        logger.info(f"Using cached attributes for {dish_name}")
+        return cached_result
+    
+    # A dish showing up on many pages at once is classified once
+    return ai_flights.do(f"attributes:{cache_key}", _classify_dish_attributes, dish_name, dish_description, cache_key)
+
+def _classify_dish_attributes(dish_name: str, dish_description: str, cache_key: str) -> List[str]:
+    try:
+        # The in-process classifier answers without a network call when it is confident enough
+        if local_classifier is not None and ATTRIBUTE_MODE in ("local", "hybrid"):
+            attributes, confidence = local_dish_attributes([{"name": dish_name, "description": dish_description}])[0]
+            if ATTRIBUTE_MODE == "local" or confidence >= LOCAL_CLASSIFIER_MIN_CONFIDENCE:
+                response_cache.set("attributes", cache_key, attributes)
+                return attributes
+            logger.info(f"Local classifier unsure about {dish_name} ({confidence:.2f}), asking zero-shot model")
         
-        logger.info(f"Dish classification response status: {response.status_code}")
+        attributes = zero_shot_dish_attributes(dish_name, dish_description)
         
-        if response.status_code == 200:
-            result = response.json()
-            
-            # Extract the top categories based on scores
-            if "labels" in result and "scores" in result:
-                # Pair labels with scores, sort by score in descending order
-                label_scores = list(zip(result["labels"], result["scores"]))
-                label_scores.sort(key=lambda x: x[1], reverse=True)
-                
-                # Take top 3 categories with scores above threshold
-                top_categories = [label for label, score in label_scores if score > 0.3][:3]
-                
-                if top_categories:
-                    logger.info(f"Identified attributes: {top_categories}")
-                    
-                    # Add more descriptive terms to attributes for better UI display
-                    final_attributes = []
-                    for attr in top_categories:
-                        # Add more descriptive terms based on attribute type
-                        if attr == "spicy":
-                            final_attributes.append("Spicy & Aromatic")
-                        elif attr == "sweet":
-                            final_attributes.append("Sweet & Indulgent")
-                        elif attr == "savory":
-                            final_attributes.append("Rich & Savory")
-                        elif attr == "healthy":
-                            final_attributes.append("Nutritious & Healthy")
-                        elif attr == "comfort food":
-                            final_attributes.append("Comforting & Satisfying")
-                        elif attr == "light":
-                            final_attributes.append("Light & Fresh")
-                        elif attr == "rich":
-                            final_attributes.append("Rich & Flavorful")
-                        elif attr == "exotic":
-                            final_attributes.append("Exotic & Unique")
-                        elif attr == "traditional":
-                            final_attributes.append("Traditional & Authentic")
-                        else:
-                            final_attributes.append(attr.capitalize())
-                    
-                    logger.info(f"Identified attributes with descriptors: {final_attributes}")
-                    
-                    # Ensure we have at least 2-3 attributes for a better UI display
-                    if len(final_attributes) < 2:
-                        if "Indian" in dish_description or "Indian" in dish_name:
-                            final_attributes.append("Aromatic Spices")
-                        elif "Italian" in dish_description or "Italian" in dish_name:
-                            final_attributes.append("Mediterranean Inspired")
-                        elif "Chinese" in dish_description or "Chinese" in dish_name:
-                            final_attributes.append("Asian Flavors")
-                        elif "vegetarian" in dish_description.lower() or "vegan" in dish_description.lower():
-                            final_attributes.append("Plant-Based Goodness")
-                    
-                    return final_attributes[:3]  # Limit to top 3 for clean UI
-            
+        if attributes is None:
+            logger.warning("Could not classify dish attributes, using fallback")
+            return ["flavorful", "traditional"]  # Improved generic fallback
+        
+        if not attributes:
             # If zero-shot fails to find good attributes, use rules-based approach
             logger.warning("Using keyword fallback for dish attributes")
-            attributes = []
-            
-            # Enhanced keyword matching with more terms and cuisine-specific attributes
-            keywords = {
-                "spicy": ["spicy", "hot", "chili", "pepper", "jalapeno", "sriracha", "curry", "spice"],
-                "sweet": ["sweet", "sugar", "honey", "dessert", "caramel", "chocolate", "fruit", "maple"],
-                "savory": ["savory", "umami", "rich", "meaty", "broth", "earthy", "hearty"],
-                "healthy": ["healthy", "nutritious", "vitamin", "lean", "protein", "fresh", "light", "vegetable"],
-                "comfort food": ["comfort", "hearty", "filling", "homestyle", "classic", "traditional", "warm"],
-                "light": ["light", "fresh", "crisp", "delicate", "subtle", "clean", "refreshing"],
-                "rich": ["rich", "creamy", "indulgent", "buttery", "cheesy", "decadent", "velvety"],
-                "exotic": ["exotic", "unique", "special", "rare", "unusual", "fusion"],
-                "traditional": ["traditional", "authentic", "classic", "original", "heritage", "old-fashioned"]
-            }
-            
-            # Cuisine-specific attributes
-            cuisine_attributes = {
-                "Italian": ["savory", "rich", "traditional"],
-                "Indian": ["spicy", "rich", "exotic"],
-                "Mexican": ["spicy", "savory", "traditional"],
-                "Thai": ["spicy", "sweet", "exotic"],
-                "Chinese": ["savory", "umami", "traditional"],
-                "Japanese": ["light", "delicate", "traditional"],
-                "Vegan": ["healthy", "fresh", "light"]
-            }
-            
-            # Add cuisine-specific attributes based on dish name
-            for cuisine, attrs in cuisine_attributes.items():
-                if cuisine.lower() in dish_name.lower() or cuisine.lower() in dish_description.lower():
-                    attributes.extend(attrs)
-            
-            # Text-based analysis for additional attributes
-            text = input_text.lower()
-            for category, terms in keywords.items():
-                if any(term in text for term in terms) and category not in attributes:
-                    attributes.append(category)
-            
-            # Add dish-specific attributes
-            if "pizza" in dish_name.lower():
-                attributes.extend(["savory", "comfort food"])
-            elif "soup" in dish_name.lower():
-                attributes.extend(["comforting", "warm"])
-            elif "salad" in dish_name.lower():
-                attributes.extend(["fresh", "healthy", "light"])
-            elif "curry" in dish_name.lower():
-                attributes.extend(["spicy", "rich", "exotic"])
-            elif "pasta" in dish_name.lower() or "spaghetti" in dish_name.lower():
-                attributes.extend(["savory", "comfort food"])
-            elif "dessert" in dish_name.lower() or "cake" in dish_name.lower() or "sweet" in dish_name.lower():
-                attributes.extend(["sweet", "indulgent"])
-            
-            # Remove duplicates and limit to top 3
-            attributes = list(set(attributes))[:3]
-            
-            logger.info(f"Identified attributes using keywords: {attributes}")
-            
-            # If we still have no attributes, add generic ones based on dish name
-            if not attributes:
-                if "chicken" in dish_name.lower() or "beef" in dish_name.lower() or "pork" in dish_name.lower():
-                    attributes = ["savory", "traditional"]
-                elif "vegetable" in dish_name.lower() or "vegan" in dish_name.lower():
-                    attributes = ["healthy", "fresh"]
-                else:
-                    attributes = ["tasty", "flavorful"]
-            
-            # Cache the fallback result too
-            response_cache[cache_key] = attributes
-            return attributes
+            attributes = keyword_dish_attributes(dish_name, dish_description)
         
-        logger.warning("Could not classify dish attributes, using fallback")
-        return ["flavorful", "traditional"]  # Improved generic fallback
+        # Cache the fallback result too
+        response_cache.set("attributes", cache_key, attributes)
+        return attributes
     
     except Exception as e:
         logger.error(f"Error classifying dish: {str(e)}")
         return ["flavorful", "delicious"]  # Default fallback
+
+def classify_dish_attributes_batch(dishes: List[Dict], stale_while_revalidate: Optional[bool] = None) -> List[List[str]]:
+    """
+    Classify several dishes ({"name", "description"}) with one zero-shot request per batch.
+
+    Results line up with the input list and follow the same rules as
+    classify_dish_attributes (threshold, descriptors, keyword fallback); each
+    result is cached per dish. With stale_while_revalidate uncached dishes get
+    keyword attributes now and are classified in one background batch.
+    """
+    if STALE_WHILE_REVALIDATE if stale_while_revalidate is None else stale_while_revalidate:
+        return serve_batch_while_revalidating(
+            "attributes",
+            dishes,
+            [f"attr_{dish['name']}" for dish in dishes],
+            lambda stale: classify_dish_attributes_batch(stale, stale_while_revalidate=False),
+            lambda dish: keyword_dish_attributes(dish["name"], dish["description"] or "")
+        )
+    
+    results: List[Optional[List[str]]] = [None] * len(dishes)
+    cache_keys = [f"attr_{dish['name']}" for dish in dishes]
+    pending = []
+    for index, cache_key in enumerate(cache_keys):
+        cached_result = response_cache.get("attributes", cache_key)
+        if cached_result is not None:
+            results[index] = cached_result
+        else:
+            pending.append(index)
+    
+    # Dishes another request is already classifying are awaited instead of sent again
+    leading, following = claim_flights("attributes", cache_keys, pending)
+    try:
+        _classify_dish_chunks(dishes, leading, results)
+    finally:
+        for index in leading:
+            ai_flights.finish(f"attributes:{cache_keys[index]}", results[index])
+    for index, call in following.items():
+        results[index] = wait_for_flight(call) or keyword_dish_attributes(dishes[index]["name"], dishes[index]["description"] or "")
+    
+    return results
+
+def _classify_dish_chunks(dishes: List[Dict], pending: List[int], results: List[Optional[List[str]]]):
+    # Fill results[index] for every pending index: local classifier first, then batched zero-shot
+    # Score everything locally in one pass and only send low-confidence dishes to the zero-shot model
+    if pending and local_classifier is not None and ATTRIBUTE_MODE in ("local", "hybrid"):
+        local_results = local_dish_attributes([dishes[index] for index in pending])
+        remaining = []
+        for index, (attributes, confidence) in zip(pending, local_results):
+            if ATTRIBUTE_MODE == "local" or confidence >= LOCAL_CLASSIFIER_MIN_CONFIDENCE:
+                results[index] = attributes
+                response_cache.set("attributes", f"attr_{dishes[index]['name']}", attributes)
+            else:
+                remaining.append(index)
+        logger.info(f"Local classifier handled {len(pending) - len(remaining)} of {len(pending)} dishes")
+        pending = remaining
+    
+    batch_size = max(1, ATTRIBUTE_BATCH_SIZE)
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        texts = [f"{dishes[index]['name']}: {dishes[index]['description'] or ''}" for index in chunk]
+        logger.info(f"Batch-classifying {len(chunk)} dishes with {ZERO_SHOT_MODEL}")
+        
+        response = _post_zero_shot(texts, timeout=10 + 0.5 * len(chunk))
+        if response is None:
+            # Same as the single-dish path when the model is unavailable (not cached)
+            for index in chunk:
+                results[index] = ["flavorful", "traditional"]
+            continue
+        if isinstance(response, dict):
+            response = [response]
+        
+        for position, index in enumerate(chunk):
+            dish_name = dishes[index]["name"]
+            dish_description = dishes[index]["description"] or ""
+            item = response[position] if isinstance(response, list) and position < len(response) else None
+            
+            # Guard against the API reordering or dropping inputs
+            if isinstance(item, dict) and item.get("sequence", texts[position]) != texts[position]:
+                item = None
+            if not (isinstance(item, dict) and "labels" in item and "scores" in item):
+                logger.warning(f"No batched classification for {dish_name}, using single-dish path")
+                # Called directly: this batch already holds the in-flight slot for the dish
+                results[index] = _classify_dish_attributes(dish_name, dish_description, f"attr_{dish_name}")
+                continue
+            
+            attributes = describe_attribute_scores(item["labels"], item["scores"], dish_name, dish_description)
+            if not attributes:
+                attributes = keyword_dish_attributes(dish_name, dish_description)
+            response_cache.set("attributes", f"attr_{dish_name}", attributes)
+            results[index] = attributes
+
+def dietary_segment(dietary_restrictions: List[str]) -> str:
+    """
+    Canonical key for a set of dietary restrictions ("" means any diet).
+    """
+    return ",".join(sorted({r.strip().lower() for r in dietary_restrictions if r.strip()}))
+
+def artifact_version(artifact_type: str) -> Tuple[str, str]:
+    """
+    Return (model, prompt_hash) identifying the current version of a precomputed artifact type.
+    A change to the model or prompt produces a new version, so stored artifacts are recomputed.
+    """
+    if artifact_type == "description":
+        model, prompt = TEXT_GENERATION_MODEL, DESCRIPTION_PROMPT_TEMPLATE
+    elif artifact_type == "attributes":
+        model = ZERO_SHOT_MODEL
+        prompt = json.dumps([ATTRIBUTE_CATEGORIES, ATTRIBUTE_SCORE_THRESHOLD, ATTRIBUTE_DESCRIPTORS], sort_keys=True)
+    else:
+        raise ValueError(f"Unknown artifact type: {artifact_type}")
+    return model, hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
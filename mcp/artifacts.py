@@ -0,0 +1,63 @@
+# mcp/artifacts.py
+import logging
+from typing import Any, Dict, List, Set, Tuple
+
+from psycopg2.extras import Json
+
+logger = logging.getLogger(__name__)
+
+def load_dish_artifacts(
+    conn,
+    dish_ids: List[int],
+    segment: str,
+    description_version: Tuple[str, str],
+    attributes_version: Tuple[str, str]
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Look up current-version artifacts for a page of dishes in one query.
+    Returns {dish_id: {"description": str, "attributes": [str]}} for the dishes that have any.
+    """
+    if not dish_ids:
+        return {}
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT dish_id, artifact_type, value
+            FROM dish_ai_artifacts
+            WHERE dish_id = ANY(%s)
+              AND ((artifact_type = 'description' AND segment = %s AND model = %s AND prompt_hash = %s)
+                OR (artifact_type = 'attributes' AND segment = '' AND model = %s AND prompt_hash = %s))
+            """,
+            (dish_ids, segment, description_version[0], description_version[1],
+             attributes_version[0], attributes_version[1])
+        )
+        artifacts: Dict[int, Dict[str, Any]] = {}
+        for dish_id, artifact_type, value in cursor.fetchall():
+            artifacts.setdefault(dish_id, {})[artifact_type] = value
+        return artifacts
+
+def existing_artifact_keys(conn, artifact_type: str, version: Tuple[str, str]) -> Set[Tuple[int, str]]:
+    """
+    Return the (dish_id, segment) pairs that already have an artifact at the given version.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT dish_id, segment FROM dish_ai_artifacts WHERE artifact_type = %s AND model = %s AND prompt_hash = %s",
+            (artifact_type, version[0], version[1])
+        )
+        return {(row[0], row[1]) for row in cursor.fetchall()}
+
+def save_dish_artifact(conn, dish_id: int, artifact_type: str, segment: str, version: Tuple[str, str], value: Any):
+    """
+    Insert or replace one artifact (caller commits).
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO dish_ai_artifacts (dish_id, artifact_type, segment, model, prompt_hash, value)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (dish_id, artifact_type, segment, model, prompt_hash)
+            DO UPDATE SET value = EXCLUDED.value, created_at = now()
+            """,
+            (dish_id, artifact_type, segment, version[0], version[1], Json(value))
+        )
@@ -0,0 +1,158 @@
+# mcp/batch_recommend.py
+"""
+Recommendations for many users at once (nightly digests, push campaigns).
+
+User ids are processed in chunks: each chunk's contexts are loaded with one
+MongoDB query, scored against the catalog snapshot as a users x items
+matrix, and written out as one NDJSON line per user. Used by the
+/mcp/v1/recommendations/batch endpoint and runnable on its own.
+
+Usage:
+    python batch_recommend.py [--input user_ids.txt] [--output recommendations.ndjson]
+                              [--chunk-size 256] [--restaurants 15] [--dishes 50]
+
+Input is one user id per line (or NDJSON lines with a "user_id" field);
+stdin/stdout are used when no file is given.
+"""
+import sys
+import json
+import argparse
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from connections import connect_postgres, connect_mongo
+from catalog import CatalogSnapshot, load_snapshot
+from interaction_log import CONTEXT_PROJECTION
+from scoring import select_positions
+
+logger = logging.getLogger("batch_recommend")
+
+def parse_user_id(line: str) -> Optional[str]:
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            user_id = json.loads(line).get("user_id")
+        except (ValueError, AttributeError):
+            return None
+        return str(user_id) if user_id else None
+    return line
+
+def chunked(user_ids: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for user_id in user_ids:
+        chunk.append(user_id)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def load_contexts(collection, user_ids: List[str]) -> Dict[str, Dict]:
+    """
+    User contexts for a chunk of ids, in one query.
+    """
+    return {
+        context["user_id"]: context
+        for context in collection.find({"user_id": {"$in": list(set(user_ids))}}, CONTEXT_PROJECTION)
+    }
+
+def recommend_chunk(
+    snapshot: CatalogSnapshot,
+    contexts: Dict[str, Dict],
+    user_ids: List[str],
+    restaurant_limit: int = 15,
+    dish_limit: int = 50
+) -> List[Dict]:
+    """
+    One result per user id, in order; unknown users get an error entry.
+    """
+    found = [user_id for user_id in user_ids if user_id in contexts]
+    results: Dict[str, Dict] = {}
+    if found:
+        scorer = snapshot.scorer
+        weights = scorer.user_weight_matrix([contexts[user_id] for user_id in found])
+        # users x items: one matrix product per item type for the whole chunk
+        restaurant_scores = weights @ scorer.restaurant_features.T
+        dish_scores = weights @ scorer.dish_features.T
+        for row, user_id in enumerate(found):
+            context = contexts[user_id]
+            selected, dish_positions = select_positions(
+                snapshot.index,
+                context.get("preferences") or {},
+                restaurant_scores[row],
+                dish_scores[row],
+                [],
+                restaurant_limit,
+                dish_limit
+            )
+            results[user_id] = {
+                "user_id": user_id,
+                "context_version": context.get("context_version", 0),
+                "restaurants": [snapshot.restaurants[p].as_dict() for p in selected],
+                "dishes": [snapshot.dishes[p].as_dict() for p in dish_positions]
+            }
+    return [
+        results.get(user_id) or {"user_id": user_id, "error": f"User context not found for user {user_id}"}
+        for user_id in user_ids
+    ]
+
+def recommend_users(
+    collection,
+    snapshot: CatalogSnapshot,
+    user_ids: Iterable[str],
+    chunk_size: int = 256,
+    restaurant_limit: int = 15,
+    dish_limit: int = 50
+) -> Iterator[Dict]:
+    """
+    Lazily yield recommendations for a (possibly unbounded) stream of user ids.
+    """
+    for chunk in chunked(user_ids, chunk_size):
+        contexts = load_contexts(collection, chunk)
+        for result in recommend_chunk(snapshot, contexts, chunk, restaurant_limit, dish_limit):
+            yield result
+
+def to_ndjson(result: Dict) -> str:
+    return json.dumps(result, default=str) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate recommendations for many users as NDJSON")
+    parser.add_argument("--input", help="File of user ids, one per line (default: stdin)")
+    parser.add_argument("--output", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Users loaded and scored together")
+    parser.add_argument("--restaurants", type=int, default=15, help="Restaurants per user")
+    parser.add_argument("--dishes", type=int, default=50, help="Dishes per user")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    conn = connect_postgres()
+    try:
+        snapshot = load_snapshot(conn)
+    finally:
+        conn.close()
+    logger.info(f"Loaded catalog: {len(snapshot.restaurants)} restaurants, {len(snapshot.dishes)} dishes")
+
+    client = connect_mongo()
+    source = open(args.input) if args.input else sys.stdin
+    target = open(args.output, "w") if args.output else sys.stdout
+    try:
+        user_ids = (user_id for user_id in map(parse_user_id, source) if user_id)
+        count = 0
+        for result in recommend_users(
+            client.get_database()["user_contexts"], snapshot, user_ids, args.chunk_size, args.restaurants, args.dishes
+        ):
+            target.write(to_ndjson(result))
+            count += 1
+        target.flush()
+        logger.info(f"Wrote recommendations for {count} users")
+    finally:
+        client.close()
+        if args.input:
+            source.close()
+        if args.output:
+            target.close()
+
+if __name__ == "__main__":
+    main()
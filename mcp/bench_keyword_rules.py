@@ -0,0 +1,66 @@
+# mcp/bench_keyword_rules.py
+"""
+Micro-benchmark: compiled keyword matcher vs. the previous per-keyword substring scans.
+
+Usage:
+    python bench_keyword_rules.py [--words 2000] [--repeat 200]
+"""
+import argparse
+import random
+import time
+
+import keyword_rules
+
+FILLER = ["the", "food", "was", "served", "with", "a", "side", "of", "rice", "and", "sauce",
+          "our", "waiter", "table", "evening", "portion", "price", "kitchen", "plate", "menu"]
+
+def legacy_sentiment(text: str):
+    # The substring logic analyze_feedback_sentiment used before the compiled matcher
+    feedback_lower = text.lower()
+    positive = keyword_rules.SENTIMENT_KEYWORDS["positive"]
+    negative = keyword_rules.SENTIMENT_KEYWORDS["negative"]
+    positive_count = sum(1 for word in positive if word in feedback_lower)
+    negative_count = sum(1 for word in negative if word in feedback_lower)
+    matched_positive = [word for word in positive if word in feedback_lower]
+    matched_negative = [word for word in negative if word in feedback_lower]
+    return positive_count, negative_count, matched_positive, matched_negative
+
+def legacy_attributes(text: str):
+    text = text.lower()
+    return [category for category, terms in keyword_rules.ATTRIBUTE_KEYWORDS.items() if any(term in text for term in terms)]
+
+def make_text(words: int, rng: random.Random, dense: bool = True) -> str:
+    # Dense texts are full of sentiment keywords; sparse ones mention a single keyword at the very end
+    if not dense:
+        return " ".join(rng.choice(FILLER) for _ in range(words)) + " great."
+    vocabulary = FILLER * 5 + keyword_rules.SENTIMENT_KEYWORDS["positive"] + keyword_rules.SENTIMENT_KEYWORDS["negative"]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+def bench(label: str, func, texts, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            func(text)
+    elapsed = time.perf_counter() - started
+    total_bytes = sum(len(text) for text in texts) * repeat
+    calls = len(texts) * repeat
+    print(f"{label:<28} {calls / elapsed:>12,.0f} texts/s {total_bytes / elapsed / 1e6:>8.1f} MB/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, default=2000, help="Words per feedback text")
+    parser.add_argument("--texts", type=int, default=20, help="Distinct texts")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    for dense in (True, False):
+        texts = [make_text(args.words, rng, dense) for _ in range(args.texts)]
+        print(f"\n{'Keyword-dense' if dense else 'Keyword-sparse'}: {args.texts} texts x {args.words} words, {args.repeat} rounds")
+        bench("sentiment (substring)", legacy_sentiment, texts, args.repeat)
+        bench("sentiment (compiled)", keyword_rules.SENTIMENT_MATCHER.find_all, texts, args.repeat)
+        bench("attributes (substring)", legacy_attributes, texts, args.repeat)
+        bench("attributes (compiled)", keyword_rules.ATTRIBUTE_MATCHER.categories, texts, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# mcp/bench_recommendation_query.py
+"""
+Benchmark: single-statement candidate query vs. the previous multi-statement flow
+(filtered restaurants, unfiltered retry, dishes, "not enough dishes" top-up).
+
+Runs against the configured PostgreSQL database with user profiles built
+from the catalog's own cuisines, price ranges and dietary tags, and reports
+statements per request and latency percentiles for both.
+
+Usage:
+    python bench_recommendation_query.py [--profiles 50] [--repeat 20]
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from psycopg2.extras import RealDictCursor
+
+from catalog import parse_dietary_tags
+from connections import connect_postgres
+from recommendation_query import fetch_recommendation_candidates
+
+class CountingCursor:
+    """
+    Cursor wrapper counting executed statements.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.statements = 0
+
+    def execute(self, sql, params=None):
+        self.statements += 1
+        return self.cursor.execute(sql, params)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+def legacy_candidates(cursor, cuisines, budget, dietary, inferred_tastes, excluded_ids) -> Dict:
+    # The statements query_recommendations ran before the single-statement query
+    filters, params = [], []
+    query = "SELECT r.id, r.name, r.cuisine, r.description, r.price_range, r.location FROM restaurants r"
+    if cuisines:
+        filters.append("r.cuisine IN (" + ", ".join(["%s"] * len(cuisines)) + ")")
+        params.extend(cuisines)
+    if budget:
+        filters.append("r.price_range = %s")
+        params.append(budget)
+    if filters:
+        query += " WHERE " + " AND ".join(filters)
+    liked = [t.replace("cuisine_", "").title() for t, v in inferred_tastes.items() if t.startswith("cuisine_") and v > 0.6]
+    if liked and filters:
+        query += " ORDER BY CASE" + "".join(f" WHEN r.cuisine = %s THEN {i + 1}" for i in range(len(liked))) + " ELSE 999 END"
+        params.extend(liked)
+    cursor.execute(query + " LIMIT 15", params)
+    restaurants = cursor.fetchall()
+    if not restaurants and filters:
+        cursor.execute("SELECT r.id, r.name, r.cuisine, r.description, r.price_range, r.location FROM restaurants r LIMIT 10")
+        restaurants = cursor.fetchall()
+
+    restaurant_ids = [r["id"] for r in restaurants]
+    excluded = [int(item) for item in excluded_ids if item.lstrip("-").isdigit()]
+    dishes = []
+    if restaurant_ids:
+        dish_query = (
+            "SELECT d.id, d.restaurant_id, d.name, d.description, d.price, d.dietary_tags FROM dishes d "
+            "WHERE d.restaurant_id = ANY(%s) AND d.id <> ALL(%s::int[])"
+        )
+        dish_params = [restaurant_ids, excluded]
+        if dietary:
+            dish_query += " AND d.dietary_tags && %s::text[]"
+            dish_params.append(dietary)
+        cursor.execute(dish_query, dish_params)
+        dishes = [dict(row, dietary_tags=list(parse_dietary_tags(row["dietary_tags"]))) for row in cursor.fetchall()]
+    if len(dishes) < 10 and restaurant_ids:
+        cursor.execute(
+            "SELECT d.id, d.restaurant_id, d.name, d.description, d.price, d.dietary_tags FROM dishes d "
+            "WHERE d.restaurant_id = ANY(%s) AND d.id <> ALL(%s::int[]) LIMIT 10",
+            [restaurant_ids, excluded + [d["id"] for d in dishes]]
+        )
+        dishes += [dict(row, dietary_tags=list(parse_dietary_tags(row["dietary_tags"]))) for row in cursor.fetchall()]
+    return {"restaurants": restaurants, "dishes": dishes}
+
+def make_profiles(cursor, count: int, rng: random.Random) -> List[Dict]:
+    cursor.execute("SELECT DISTINCT cuisine FROM restaurants")
+    cuisines = [row["cuisine"] for row in cursor.fetchall()]
+    cursor.execute("SELECT DISTINCT price_range FROM restaurants")
+    budgets = [row["price_range"] for row in cursor.fetchall()]
+    cursor.execute("SELECT DISTINCT unnest(dietary_tags) AS tag FROM dishes")
+    tags = [row["tag"] for row in cursor.fetchall()]
+    cursor.execute("SELECT id FROM dishes")
+    dish_ids = [str(row["id"]) for row in cursor.fetchall()]
+    profiles = []
+    for _ in range(count):
+        profiles.append({
+            "cuisines": rng.sample(cuisines, rng.randint(0, min(3, len(cuisines)))),
+            "budget": rng.choice(budgets + [None]),
+            "dietary": rng.sample(tags, rng.randint(0, min(2, len(tags)))),
+            "inferred_tastes": {f"cuisine_{c.lower()}": rng.random() for c in rng.sample(cuisines, min(2, len(cuisines)))},
+            "excluded": rng.sample(dish_ids, min(len(dish_ids), rng.randint(0, 5)))
+        })
+    return profiles
+
+def bench(label: str, func, conn, profiles: List[Dict], repeat: int):
+    latencies = []
+    with conn.cursor(cursor_factory=RealDictCursor) as raw_cursor:
+        cursor = CountingCursor(raw_cursor)
+        for _ in range(repeat):
+            for profile in profiles:
+                started = time.perf_counter()
+                func(cursor, profile["cuisines"], profile["budget"], profile["dietary"],
+                     profile["inferred_tastes"], profile["excluded"])
+                latencies.append(time.perf_counter() - started)
+        statements = cursor.statements
+    conn.rollback()
+    latencies.sort()
+    calls = len(latencies)
+    p50 = latencies[calls // 2] * 1000
+    p95 = latencies[min(calls - 1, int(calls * 0.95))] * 1000
+    print(f"{label:<16} {statements / calls:>6.2f} statements/request  p50 {p50:>7.2f} ms  p95 {p95:>7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=50, help="Distinct synthetic user profiles")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the profiles")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    conn = connect_postgres()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            profiles = make_profiles(cursor, args.profiles, random.Random(args.seed))
+        conn.rollback()
+        print(f"{len(profiles)} profiles x {args.repeat} passes")
+        bench("multi-statement", legacy_candidates, conn, profiles, args.repeat)
+        bench("single query", fetch_recommendation_candidates, conn, profiles, args.repeat)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+# mcp/cache.py
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def _estimate_size(key: str, value: Any) -> int:
+    # Rough footprint in bytes: the key plus the JSON-encoded value
+    try:
+        return len(key) + len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(key) + len(str(value))
+
+def _digest(kind: str, key: str) -> str:
+    # Long keys (e.g. ones embedding user preferences) are stored as a fixed-size digest
+    return f"{kind}:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+
+def _wrap(value: Any, ttl: float) -> Dict:
+    # Backends keep entries through the stale window, so record when the value stops being fresh
+    return {"__cached__": value, "fresh_until": time.time() + ttl}
+
+def _unwrap(stored: Any) -> Tuple[Any, Optional[float]]:
+    # Returns (value, seconds it stays fresh); None for entries written before stale windows existed
+    if isinstance(stored, dict) and "__cached__" in stored and "fresh_until" in stored:
+        return stored["__cached__"], stored["fresh_until"] - time.time()
+    return stored, None
+
+class SQLiteCacheBackend:
+    """
+    Shared on-disk cache backend for several workers on one host.
+    Each thread gets its own connection; entries expire by wall-clock time.
+    """
+
+    # Purge expired rows after this many writes
+    PURGE_EVERY = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ai_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+        logger.info(f"Using SQLite AI cache backend at {path}")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            # WAL lets readers in other workers proceed while one worker writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value FROM ai_cache WHERE key = ? AND expires_at > ?",
+            (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO ai_cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM ai_cache WHERE expires_at <= ?", (time.time(),))
+        conn.commit()
+
+    def describe(self) -> str:
+        return f"sqlite:{self.path}"
+
+class RedisCacheBackend:
+    """
+    Shared cache backend for several hosts, using any Redis-protocol server.
+    """
+
+    def __init__(self, url: str, prefix: str = "mcp:ai:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The redis package is required for AI_CACHE_BACKEND=redis")
+        self.url = url
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
+        logger.info(f"Using Redis AI cache backend at {url}")
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: float):
+        self._client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def describe(self) -> str:
+        return "redis"
+
+def build_cache_backend(name: str, sqlite_path: str = "", redis_url: str = ""):
+    """
+    Create the shared cache backend selected by name ("memory", "sqlite" or "redis").
+    Returns None for the in-memory-only setup.
+    """
+    name = (name or "memory").lower()
+    if name == "sqlite":
+        return SQLiteCacheBackend(sqlite_path)
+    if name == "redis":
+        return RedisCacheBackend(redis_url)
+    if name != "memory":
+        logger.warning(f"Unknown AI cache backend '{name}', using in-memory cache only")
+    return None
+
+class ResponseCache:
+    """
+    Thread-safe in-memory LRU cache for AI results with entry/byte limits,
+    per-kind TTLs and hit/miss/eviction counters.
+
+    An optional shared backend (SQLite or Redis) sits behind the in-memory
+    tier so results computed by one worker are reused by the others and
+    survive restarts.
+
+    Kinds with a stale window keep entries for that long past their TTL;
+    get() treats them as expired, get_stale() still returns them so the
+    caller can serve the old value while it recomputes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 3600.0,
+        backend=None,
+        stale_windows: Optional[Dict[str, float]] = None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.backend = backend
+        self.stale_windows = stale_windows or {}
+
+        # digest -> (fresh_until, expires_at, size, value), oldest first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._backend_hits = 0
+        self._backend_errors = 0
+        self._stale_hits = 0
+
+    def ttl_for(self, kind: str) -> float:
+        return self.ttls.get(kind, self.default_ttl)
+
+    def stale_window_for(self, kind: str) -> float:
+        return self.stale_windows.get(kind, 0.0)
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """
+        Return the cached value for (kind, key), or None if missing or expired.
+        Falls back to the shared backend when the in-memory tier misses.
+        """
+        entry = self._lookup(kind, key, allow_stale=False)
+        return entry[0] if entry is not None else None
+
+    def get_stale(self, kind: str, key: str) -> Optional[Tuple[Any, bool]]:
+        """
+        Return (value, is_fresh) for (kind, key), including values past their TTL
+        but still inside the kind's stale window, or None if there is nothing usable.
+        """
+        return self._lookup(kind, key, allow_stale=True)
+
+    def _lookup(self, kind: str, key: str, allow_stale: bool) -> Optional[Tuple[Any, bool]]:
+        digest = _digest(kind, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                fresh_until, expires_at, size, value = entry
+                if expires_at > now:
+                    fresh = fresh_until > now
+                    if fresh or allow_stale:
+                        self._entries.move_to_end(digest)
+                        self._hits += 1
+                        if not fresh:
+                            self._stale_hits += 1
+                        return value, fresh
+                else:
+                    del self._entries[digest]
+                    self._bytes -= size
+                    self._expirations += 1
+
+        if self.backend is not None:
+            try:
+                stored = self.backend.get(digest)
+            except Exception as e:
+                stored = None
+                with self._lock:
+                    self._backend_errors += 1
+                logger.warning(f"AI cache backend read failed: {e}")
+            if stored is not None:
+                value, fresh_for = _unwrap(stored)
+                if fresh_for is None:
+                    fresh_for = self.ttl_for(kind)
+                if fresh_for > 0 or allow_stale:
+                    self._store(digest, value, fresh_for, fresh_for + self.stale_window_for(kind))
+                    with self._lock:
+                        self._hits += 1
+                        self._backend_hits += 1
+                        if fresh_for <= 0:
+                            self._stale_hits += 1
+                    return value, fresh_for > 0
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, kind: str, key: str, value: Any):
+        """
+        Store a value under (kind, key) with the TTL configured for its kind,
+        evicting least recently used entries until the limits are met.
+        """
+        digest = _digest(kind, key)
+        ttl = self.ttl_for(kind)
+        lifetime = ttl + self.stale_window_for(kind)
+        self._store(digest, value, ttl, lifetime)
+        if self.backend is not None:
+            try:
+                self.backend.set(digest, _wrap(value, ttl), lifetime)
+            except Exception as e:
+                with self._lock:
+                    self._backend_errors += 1
+                logger.warning(f"AI cache backend write failed: {e}")
+
+    def _store(self, digest: str, value: Any, ttl: float, lifetime: float):
+        size = _estimate_size(digest, value)
+        if size > self.max_bytes:
+            logger.warning(f"Not caching result of {size} bytes (limit {self.max_bytes})")
+            return
+        now = time.monotonic()
+        with self._lock:
+            previous = self._entries.pop(digest, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[digest] = (now + ttl, now + lifetime, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """
+        Return size and hit/miss/eviction counters for the health endpoint.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "backend": self.backend.describe() if self.backend is not None else "memory",
+                "backend_hits": self._backend_hits,
+                "backend_errors": self._backend_errors,
+                "stale_hits": self._stale_hits
+            }
@@ -0,0 +1,189 @@
+# mcp/catalog.py
+"""
+Read-only in-memory snapshot of the restaurant/dish catalog.
+
+The tables are small and read-mostly, so the MCP service keeps a compact
+copy in memory and answers recommendation and interaction lookups without a
+Postgres round-trip. A background thread reads the catalog version (a
+counter bumped by triggers on both tables, see migrations/0002) every
+refresh_interval seconds and reloads only when it changed.
+"""
+import time
+import threading
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from catalog_index import CatalogIndex
+from scoring import CatalogScorer
+
+logger = logging.getLogger(__name__)
+
+def parse_dietary_tags(value) -> Tuple[str, ...]:
+    """
+    Normalize a dietary_tags column value (TEXT[] list or '{a,b}' string) to a tuple.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    if not value:
+        return ()
+    tags_str = str(value).strip("{}")
+    return tuple(tag for tag in tags_str.split(",") if tag) if tags_str else ()
+
+class RestaurantRecord:
+    __slots__ = ("id", "name", "cuisine", "description", "price_range", "location")
+
+    def __init__(self, id: int, name: str, cuisine: str, description: str, price_range: str, location: str):
+        self.id = id
+        self.name = name
+        self.cuisine = cuisine
+        self.description = description
+        self.price_range = price_range
+        self.location = location
+
+    def as_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+class DishRecord:
+    __slots__ = ("id", "restaurant_id", "name", "description", "price", "dietary_tags")
+
+    def __init__(self, id: int, restaurant_id: int, name: str, description: str, price: float, dietary_tags: Tuple[str, ...]):
+        self.id = id
+        self.restaurant_id = restaurant_id
+        self.name = name
+        self.description = description
+        self.price = price
+        self.dietary_tags = dietary_tags
+
+    def as_dict(self) -> Dict:
+        row = {slot: getattr(self, slot) for slot in self.__slots__}
+        row["dietary_tags"] = list(self.dietary_tags)
+        return row
+
+class CatalogSnapshot:
+    """
+    Immutable catalog: records in id order plus lookup maps, a filter index
+    and the feature matrices used for ranking.
+    """
+
+    def __init__(self, restaurants: List[RestaurantRecord], dishes: List[DishRecord], version: str):
+        self.restaurants = restaurants
+        self.dishes = dishes
+        self.version = version
+        self.loaded_at = time.time()
+        self.restaurants_by_id: Dict[int, RestaurantRecord] = {r.id: r for r in restaurants}
+        self.dishes_by_id: Dict[int, DishRecord] = {d.id: d for d in dishes}
+        by_restaurant: Dict[int, List[DishRecord]] = {}
+        for dish in dishes:
+            by_restaurant.setdefault(dish.restaurant_id, []).append(dish)
+        self.dishes_by_restaurant: Dict[int, Tuple[DishRecord, ...]] = {
+            restaurant_id: tuple(restaurant_dishes) for restaurant_id, restaurant_dishes in by_restaurant.items()
+        }
+        self.index = CatalogIndex(restaurants, dishes)
+        self.scorer = CatalogScorer(restaurants, dishes)
+
+    def dish_cuisine(self, dish: DishRecord) -> Optional[str]:
+        restaurant = self.restaurants_by_id.get(dish.restaurant_id)
+        return restaurant.cuisine if restaurant else None
+
+# Single-row read; the version changes whenever any row is inserted, updated or deleted
+FINGERPRINT_SQL = "SELECT version::text FROM catalog_version"
+
+def catalog_fingerprint(conn) -> str:
+    with conn.cursor() as cursor:
+        cursor.execute(FINGERPRINT_SQL)
+        return cursor.fetchone()[0]
+
+def load_snapshot(conn) -> CatalogSnapshot:
+    """
+    Read both tables and their version from one REPEATABLE READ snapshot.
+    Must be called at the start of a transaction.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        cursor.execute(FINGERPRINT_SQL)
+        version = cursor.fetchone()[0]
+        cursor.execute("SELECT id, name, cuisine, description, price_range, location FROM restaurants ORDER BY id")
+        restaurants = [
+            RestaurantRecord(row[0], row[1], row[2], row[3] or "", row[4] or "", row[5] or "")
+            for row in cursor.fetchall()
+        ]
+        cursor.execute("SELECT id, restaurant_id, name, description, price, dietary_tags FROM dishes ORDER BY id")
+        dishes = [
+            DishRecord(row[0], row[1], row[2], row[3] or "", float(row[4] or 0), parse_dietary_tags(row[5]))
+            for row in cursor.fetchall()
+        ]
+    return CatalogSnapshot(restaurants, dishes, version)
+
+class CatalogStore:
+    """
+    Holds the current CatalogSnapshot and keeps it fresh from a background thread.
+
+    connection_factory is a context manager yielding a Postgres connection
+    (e.g. main.get_postgres_conn). Until the first load succeeds, snapshot is
+    None and callers fall back to querying Postgres.
+    """
+
+    def __init__(self, connection_factory: Callable, refresh_interval: float = 60.0):
+        self.connection_factory = connection_factory
+        self.refresh_interval = refresh_interval
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._reloads = 0
+        self._checks = 0
+        self._errors = 0
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reload the snapshot if the catalog version changed. Returns True if it was reloaded.
+        """
+        with self._lock:
+            with self.connection_factory() as conn:
+                self._checks += 1
+                if not force and self.snapshot is not None:
+                    changed = catalog_fingerprint(conn) != self.snapshot.version
+                    # load_snapshot starts its own transaction
+                    conn.rollback()
+                    if not changed:
+                        return False
+                snapshot = load_snapshot(conn)
+            # Readers keep using whichever snapshot they already hold; the swap is a single assignment
+            self.snapshot = snapshot
+            self._reloads += 1
+        logger.info(f"Loaded catalog snapshot: {len(snapshot.restaurants)} restaurants, {len(snapshot.dishes)} dishes")
+        return True
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="mcp-catalog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(5.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                self._errors += 1
+                logger.error(f"Catalog refresh failed: {e}")
+            # Retry quickly until the first load succeeds
+            self._stopping.wait(self.refresh_interval if self.snapshot is not None else min(5.0, self.refresh_interval))
+
+    def stats(self) -> Dict:
+        snapshot = self.snapshot
+        return {
+            "loaded": snapshot is not None,
+            "version": snapshot.version if snapshot else None,
+            "restaurants": len(snapshot.restaurants) if snapshot else 0,
+            "dishes": len(snapshot.dishes) if snapshot else 0,
+            "age_seconds": round(time.time() - snapshot.loaded_at, 1) if snapshot else None,
+            "checks": self._checks,
+            "reloads": self._reloads,
+            "errors": self._errors
+        }
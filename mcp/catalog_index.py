@@ -0,0 +1,86 @@
+# mcp/catalog_index.py
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+def _postings(values: Sequence[str], size: int) -> Dict[str, np.ndarray]:
+    # value -> boolean membership array over the items, built in one pass
+    index: Dict[str, np.ndarray] = {}
+    for position, value in enumerate(values):
+        if value not in index:
+            index[value] = np.zeros(size, dtype=bool)
+        index[value][position] = True
+    return index
+
+class CatalogIndex:
+    """
+    Inverted index over a catalog snapshot, backed by NumPy boolean arrays.
+
+    Restaurants are indexed by cuisine, price range and id, dishes by dietary
+    tag and by the position of their restaurant, so a filter such as
+    "Indian OR Thai, $$, vegan" is a few vectorized OR/AND operations instead
+    of a loop over rows. Positions follow the snapshot's id order.
+    """
+
+    def __init__(self, restaurants, dishes):
+        self.restaurant_count = len(restaurants)
+        self.dish_count = len(dishes)
+        self.restaurant_ids = np.array([r.id for r in restaurants], dtype=np.int64)
+        self.dish_ids = np.array([d.id for d in dishes], dtype=np.int64)
+
+        self.by_cuisine = _postings([r.cuisine for r in restaurants], self.restaurant_count)
+        self.by_price_range = _postings([r.price_range for r in restaurants], self.restaurant_count)
+
+        self.by_dietary_tag: Dict[str, np.ndarray] = {}
+        for position, dish in enumerate(dishes):
+            for tag in dish.dietary_tags:
+                if tag not in self.by_dietary_tag:
+                    self.by_dietary_tag[tag] = np.zeros(self.dish_count, dtype=bool)
+                self.by_dietary_tag[tag][position] = True
+
+        # Position of each dish's restaurant (-1 if the restaurant is missing)
+        restaurant_position = {r.id: position for position, r in enumerate(restaurants)}
+        self.dish_restaurant = np.array([restaurant_position.get(d.restaurant_id, -1) for d in dishes], dtype=np.int64)
+
+    @staticmethod
+    def _any_of(postings: Dict[str, np.ndarray], values: Iterable[str], size: int) -> np.ndarray:
+        mask = np.zeros(size, dtype=bool)
+        for value in values:
+            bits = postings.get(value)
+            if bits is not None:
+                mask |= bits
+        return mask
+
+    def restaurant_mask(self, cuisines: Optional[Iterable[str]] = None, price_ranges: Optional[Iterable[str]] = None) -> np.ndarray:
+        """
+        Restaurants matching any of cuisines AND any of price_ranges; an empty or None filter matches all.
+        """
+        mask = np.ones(self.restaurant_count, dtype=bool)
+        if cuisines:
+            mask &= self._any_of(self.by_cuisine, cuisines, self.restaurant_count)
+        if price_ranges:
+            mask &= self._any_of(self.by_price_range, price_ranges, self.restaurant_count)
+        return mask
+
+    def dish_mask(
+        self,
+        restaurant_mask: Optional[np.ndarray] = None,
+        dietary_tags: Optional[Iterable[str]] = None,
+        excluded_ids: Optional[Iterable[str]] = None
+    ) -> np.ndarray:
+        """
+        Dishes of restaurants in restaurant_mask, carrying any of dietary_tags,
+        and not in excluded_ids (string ids, as received from the API).
+        """
+        mask = np.ones(self.dish_count, dtype=bool)
+        if restaurant_mask is not None:
+            known = self.dish_restaurant >= 0
+            mask &= known
+            mask[known] &= restaurant_mask[self.dish_restaurant[known]]
+        if dietary_tags:
+            mask &= self._any_of(self.by_dietary_tag, dietary_tags, self.dish_count)
+        if excluded_ids:
+            numeric = [int(item) for item in excluded_ids if str(item).lstrip("-").isdigit()]
+            if numeric:
+                mask &= ~np.isin(self.dish_ids, np.array(numeric, dtype=np.int64))
+        return mask
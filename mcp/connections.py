@@ -0,0 +1,24 @@
+# mcp/connections.py
+"""
+Database connections for the command-line tools (precompute.py, migrate.py,
+batch_recommend.py, benchmarks), configured from the same environment
+variables as the service. The service itself uses pg_pool.
+"""
+import os
+
+from dotenv import load_dotenv
+load_dotenv()
+import psycopg2
+from pymongo import MongoClient
+
+def connect_postgres():
+    return psycopg2.connect(
+        host=os.getenv("POSTGRES_HOST", "localhost"),
+        port=os.getenv("POSTGRES_PORT", "5432"),
+        user=os.getenv("POSTGRES_USER", "user"),
+        password=os.getenv("POSTGRES_PASSWORD", "password"),
+        dbname=os.getenv("POSTGRES_DB", "restaurants_db")
+    )
+
+def connect_mongo() -> MongoClient:
+    return MongoClient(os.getenv("MONGO_URI", "mongodb://localhost:27017/mcp_context_db"))
@@ -0,0 +1,209 @@
+# mcp/feedback_queue.py
+import uuid
+import time
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+class FeedbackQueue:
+    """
+    Durable job queue for AI feedback, stored in a MongoDB collection.
+
+    Jobs are inserted as "queued" and claimed atomically by worker threads
+    (find_one_and_update), so several MCP replicas can share one queue. Each
+    worker claims up to batch_size jobs and hands them to handler(jobs) in one
+    call. The handler returns one result dict per job, or an Exception
+    instance for a job that failed. Failed jobs are retried up to
+    max_attempts times. Jobs left in "processing" by a crashed worker are
+    requeued after visibility_timeout seconds. Finished jobs expire after
+    retention seconds.
+    """
+
+    def __init__(
+        self,
+        collection,
+        handler: Callable[[List[Dict]], List[Any]],
+        workers: int = 2,
+        batch_size: int = 16,
+        poll_interval: float = 2.0,
+        visibility_timeout: float = 300.0,
+        max_attempts: int = 3,
+        retention: float = 7 * 86400
+    ):
+        self.collection = collection
+        self.handler = handler
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retention = retention
+
+        self._threads: List[threading.Thread] = []
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._last_requeue = 0.0
+
+        self._batches = 0
+        self._completed = 0
+        self._failed = 0
+        self._retried = 0
+
+    def ensure_indexes(self):
+        self.collection.create_index([("status", ASCENDING), ("created_at", ASCENDING)])
+        self.collection.create_index([("user_id", ASCENDING)])
+        # MongoDB removes finished jobs once they are older than the retention period
+        self.collection.create_index("finished_at", expireAfterSeconds=int(self.retention))
+
+    def enqueue(self, user_id: str, payload: Dict) -> str:
+        """
+        Persist a job and wake a worker. Returns the job id.
+        """
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        self.collection.insert_one({
+            "_id": job_id,
+            "user_id": user_id,
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now
+        })
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self.collection.find_one({"_id": job_id})
+        if job is not None:
+            job["job_id"] = job.pop("_id")
+        return job
+
+    def requeue_stale(self) -> int:
+        """
+        Put jobs whose worker stopped before finishing them back in the queue,
+        or mark them failed once they have used up max_attempts (a job that
+        crashes its worker every time is not retried forever).
+        """
+        now = datetime.utcnow()
+        stale = {"status": "processing", "claimed_at": {"$lt": now - timedelta(seconds=self.visibility_timeout)}}
+        failed = self.collection.update_many(
+            dict(stale, attempts={"$gte": self.max_attempts}),
+            {"$set": {"status": "failed", "error": "Worker stopped before finishing the job", "updated_at": now, "finished_at": now}}
+        )
+        if failed.modified_count:
+            logger.error(f"Gave up on {failed.modified_count} stalled feedback job(s) after {self.max_attempts} attempts")
+            with self._lock:
+                self._failed += failed.modified_count
+        result = self.collection.update_many(
+            dict(stale, attempts={"$lt": self.max_attempts}),
+            {"$set": {"status": "queued", "updated_at": now}}
+        )
+        if result.modified_count:
+            logger.warning(f"Requeued {result.modified_count} stalled feedback job(s)")
+        return result.modified_count
+
+    def start(self):
+        """
+        Create indexes, recover jobs left over from a previous run and start the workers.
+        """
+        try:
+            self.ensure_indexes()
+            # Queued jobs survive restarts as-is; ones a dead worker had claimed are picked up again
+            self.requeue_stale()
+        except Exception as e:
+            # Workers keep retrying, so the service still starts while MongoDB is unavailable
+            logger.error(f"Could not prepare feedback queue: {e}")
+        self._last_requeue = time.monotonic()
+        self._stopping.clear()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"mcp-feedback-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} feedback workers")
+
+    def stop(self, timeout: float = 5.0):
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        logger.info("Stopped feedback workers")
+
+    def _claim_batch(self) -> List[Dict]:
+        jobs = []
+        while len(jobs) < self.batch_size:
+            now = datetime.utcnow()
+            job = self.collection.find_one_and_update(
+                {"status": "queued"},
+                {"$set": {"status": "processing", "claimed_at": now, "updated_at": now}, "$inc": {"attempts": 1}},
+                sort=[("created_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER
+            )
+            if job is None:
+                break
+            jobs.append(job)
+        return jobs
+
+    def _finish(self, job: Dict, outcome: Any):
+        now = datetime.utcnow()
+        if not isinstance(outcome, Exception):
+            update = {"status": "done", "result": outcome, "updated_at": now, "finished_at": now}
+            with self._lock:
+                self._completed += 1
+        elif job.get("attempts", 1) < self.max_attempts:
+            update = {"status": "queued", "error": str(outcome), "updated_at": now}
+            with self._lock:
+                self._retried += 1
+        else:
+            update = {"status": "failed", "error": str(outcome), "updated_at": now, "finished_at": now}
+            with self._lock:
+                self._failed += 1
+        self.collection.update_one({"_id": job["_id"], "status": "processing"}, {"$set": update})
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                if time.monotonic() - self._last_requeue > self.visibility_timeout:
+                    self._last_requeue = time.monotonic()
+                    self.requeue_stale()
+                jobs = self._claim_batch()
+            except Exception as e:
+                logger.error(f"Could not claim feedback jobs: {e}")
+                self._stopping.wait(self.poll_interval)
+                continue
+
+            if not jobs:
+                # Woken early by enqueue(); polling covers jobs queued by other replicas
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+
+            try:
+                outcomes = self.handler(jobs)
+            except Exception as e:
+                logger.error(f"Feedback batch of {len(jobs)} job(s) failed: {e}")
+                outcomes = [e] * len(jobs)
+            with self._lock:
+                self._batches += 1
+            for job, outcome in zip(jobs, outcomes):
+                try:
+                    self._finish(job, outcome)
+                except Exception as e:
+                    logger.error(f"Could not record outcome of feedback job {job['_id']}: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "batches": self._batches,
+                "completed": self._completed,
+                "failed": self._failed,
+                "retried": self._retried
+            }
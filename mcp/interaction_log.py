@@ -0,0 +1,87 @@
+# mcp/interaction_log.py
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+# Hot-path reads of a user context: everything except the recent-interactions window
+CONTEXT_PROJECTION = {"_id": 0, "interaction_history": 0}
+
+def interaction_time(timestamp: Optional[str], default: datetime) -> datetime:
+    """
+    When an interaction happened, from its ISO 8601 timestamp, as naive UTC
+    (like datetime.utcnow()); default when it is missing or unparseable.
+    """
+    if not timestamp:
+        return default
+    try:
+        # fromisoformat does not accept a trailing "Z" before Python 3.11
+        parsed = datetime.fromisoformat(timestamp.strip().replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return default
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+class InteractionLog:
+    """
+    Full interaction history in its own time-ordered collection.
+
+    Every interaction is appended to the interactions collection (indexed by
+    user and time, optionally expiring after ttl_days). The user context keeps
+    only the last recent_window interactions plus a running interaction_count,
+    so user_contexts documents stay constant-size.
+    """
+
+    def __init__(self, contexts, interactions, recent_window: int = 20, ttl_days: float = 0):
+        self.contexts = contexts
+        self.interactions = interactions
+        self.recent_window = recent_window
+        self.ttl_days = ttl_days
+
+    def ensure_indexes(self):
+        self.contexts.create_index("user_id", unique=True)
+        self.interactions.create_index([("user_id", ASCENDING), ("created_at", DESCENDING)])
+        if self.ttl_days > 0:
+            # MongoDB removes interactions once they are older than ttl_days
+            self.interactions.create_index("created_at", expireAfterSeconds=int(self.ttl_days * 86400))
+
+    def history_fields(self, interactions: List[Dict]) -> Dict:
+        """
+        Update-pipeline $set fields appending interactions to a context's
+        bounded recent window and counting them.
+        """
+        appended = {"$concatArrays": [{"$ifNull": ["$interaction_history", []]}, {"$literal": interactions}]}
+        return {
+            "interaction_history": {"$slice": [appended, -self.recent_window]},
+            "interaction_count": {"$add": [{"$ifNull": ["$interaction_count", 0]}, len(interactions)]}
+        }
+
+    def log(self, user_id: str, interactions: List[Dict]):
+        self.log_batch({user_id: interactions})
+
+    def log_batch(self, interactions_by_user: Dict[str, List[Dict]]):
+        """
+        Append interactions of many users with one insert. created_at is when
+        the interaction happened (its timestamp), so replayed and bulk ingests
+        sort and expire by event time; ingestion time only fills in when the
+        timestamp is missing.
+        """
+        now = datetime.utcnow()
+        documents = [
+            dict(interaction, user_id=user_id, created_at=interaction_time(interaction.get("timestamp"), now))
+            for user_id, interactions in interactions_by_user.items()
+            for interaction in interactions
+        ]
+        if documents:
+            self.interactions.insert_many(documents, ordered=False)
+
+    def recent(self, user_id: str, limit: int = 50) -> List[Dict]:
+        """
+        Latest interactions of a user, newest first.
+        """
+        cursor = self.interactions.find({"user_id": user_id}, {"_id": 0}).sort("created_at", DESCENDING).limit(limit)
+        return list(cursor)
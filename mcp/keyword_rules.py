@@ -0,0 +1,176 @@
+# mcp/keyword_rules.py
+import re
+import string
+from typing import Dict, List, Sequence, Tuple
+
+# Punctuation (including hyphens) becomes whitespace
+_NORMALIZE = str.maketrans({char: " " for char in string.punctuation})
+
+def normalize(text: str) -> str:
+    return text.lower().translate(_NORMALIZE)
+
+def inflections(term: str) -> List[str]:
+    """
+    Surface forms counted as the term: plurals, -ed/-ing/-ly/-er/-est, and the
+    forms that change its ending (love -> loving, terrible -> terribly,
+    tasty -> tastier, disappointed -> disappointing). Words that merely start
+    with the term ("goodbye", "hotel") are not among them.
+    """
+    forms = {term, term + "s", term + "es", term + "ed", term + "ing", term + "ly", term + "er", term + "est"}
+    if term.endswith("e"):
+        stem = term[:-1]
+        forms.update({term + "d", term + "r", term + "st", stem + "ing", stem + "y"})
+    elif term.endswith("y"):
+        stem = term[:-1]
+        forms.update({stem + "ies", stem + "ied", stem + "ier", stem + "iest", stem + "ily", stem + "iness"})
+    elif term.endswith("ed"):
+        stem = term[:-2]
+        forms.update({stem, stem + "s", stem + "ing", stem + "ment", stem + "ments"})
+    return sorted(forms)
+
+def _trie_pattern(words: Sequence[str]) -> str:
+    # One regex alternation factored by common prefixes, so the engine tries each prefix once
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def pattern(node: Dict) -> str:
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if "" in node else group
+
+    return pattern(trie)
+
+class KeywordMatcher:
+    """
+    Multi-pattern keyword matcher compiled once from a {category: [terms]} rule table.
+
+    Every inflection of every term (see inflections) goes into one
+    prefix-factored regex at construction, so a single finditer over the
+    lowercased text finds all hits for all categories. Matches are whole
+    words: "loved" and "disappointing" count, "goodbye" and "hotel" do not.
+    Multi-word terms match across any punctuation or whitespace. With
+    substring=True terms match anywhere in the text instead, like the
+    dish-name checks ("cake" in "cheesecake").
+    """
+
+    def __init__(self, rules: Dict[str, Sequence[str]], substring: bool = False):
+        self.rules = {category: [" ".join(normalize(term).split()) for term in terms] for category, terms in rules.items()}
+        self.substring = substring
+        # Every surface form (words separated by single spaces) mapped to its canonical terms
+        self._terms_for_form: Dict[str, set] = {}
+        for terms in self.rules.values():
+            for term in terms:
+                for form in [term] if substring else inflections(term):
+                    self._terms_for_form.setdefault(form, set()).add(term)
+        words = _trie_pattern(sorted(self._terms_for_form)).replace(r"\ ", r"[\W_]+")
+        if substring:
+            # Lookahead capture, so overlapping terms are all found
+            self._pattern = re.compile(r"(?=(" + words + r"))")
+        else:
+            self._pattern = re.compile(r"(?<![^\W_])(" + words + r")(?![^\W_])")
+
+    def matched_terms(self, text: str) -> set:
+        """
+        Canonical terms occurring in text, in one pass.
+        """
+        found = set()
+        for form in {match.group(1) for match in self._pattern.finditer(text.lower())}:
+            terms = self._terms_for_form.get(form)
+            if terms is None:
+                # A multi-word form matched across punctuation
+                terms = self._terms_for_form[" ".join(normalize(form).split())]
+            found |= terms
+        return found
+
+    def find_all(self, text: str) -> Dict[str, List[str]]:
+        """
+        Return {category: [matched terms in rule-table order]} for every category with a hit.
+        """
+        found = self.matched_terms(text)
+        if not found:
+            return {}
+        hits = {}
+        for category, terms in self.rules.items():
+            category_hits = [term for term in terms if term in found]
+            if category_hits:
+                hits[category] = category_hits
+        return hits
+
+    def categories(self, text: str) -> List[str]:
+        """
+        Categories with at least one hit, in rule-table order.
+        """
+        return list(self.find_all(text))
+
+# --- Rule tables ---
+
+SENTIMENT_KEYWORDS = {
+    "positive": ["good", "great", "love", "delicious", "tasty", "amazing", "excellent", "enjoy", "best", "favorite"],
+    "negative": ["bad", "awful", "terrible", "worst", "dislike", "hate", "disgusting", "disappointed", "poor", "mediocre"]
+}
+
+ATTRIBUTE_KEYWORDS = {
+    "spicy": ["spicy", "hot", "chili", "pepper", "jalapeno", "sriracha", "curry", "spice"],
+    "sweet": ["sweet", "sugar", "honey", "dessert", "caramel", "chocolate", "fruit", "maple"],
+    "savory": ["savory", "umami", "rich", "meaty", "broth", "earthy", "hearty"],
+    "healthy": ["healthy", "nutritious", "vitamin", "lean", "protein", "fresh", "light", "vegetable"],
+    "comfort food": ["comfort", "hearty", "filling", "homestyle", "classic", "traditional", "warm"],
+    "light": ["light", "fresh", "crisp", "delicate", "subtle", "clean", "refreshing"],
+    "rich": ["rich", "creamy", "indulgent", "buttery", "cheesy", "decadent", "velvety"],
+    "exotic": ["exotic", "unique", "special", "rare", "unusual", "fusion"],
+    "traditional": ["traditional", "authentic", "classic", "original", "heritage", "old-fashioned"]
+}
+
+# Cuisine-specific attributes, applied when the cuisine is named in the dish text
+CUISINE_ATTRIBUTES = {
+    "Italian": ["savory", "rich", "traditional"],
+    "Indian": ["spicy", "rich", "exotic"],
+    "Mexican": ["spicy", "savory", "traditional"],
+    "Thai": ["spicy", "sweet", "exotic"],
+    "Chinese": ["savory", "umami", "traditional"],
+    "Japanese": ["light", "delicate", "traditional"],
+    "Vegan": ["healthy", "fresh", "light"]
+}
+
+# Dish-name rules in priority order; only the first matching rule applies
+DISH_NAME_RULES: List[Tuple[str, List[str], List[str]]] = [
+    ("pizza", ["pizza"], ["savory", "comfort food"]),
+    ("soup", ["soup"], ["comforting", "warm"]),
+    ("salad", ["salad"], ["fresh", "healthy", "light"]),
+    ("curry", ["curry"], ["spicy", "rich", "exotic"]),
+    ("pasta", ["pasta", "spaghetti"], ["savory", "comfort food"]),
+    ("dessert", ["dessert", "cake", "sweet"], ["sweet", "indulgent"])
+]
+
+# Generic attributes when nothing else matched, in priority order
+GENERIC_NAME_RULES: List[Tuple[str, List[str], List[str]]] = [
+    ("meat", ["chicken", "beef", "pork"], ["savory", "traditional"]),
+    ("vegetable", ["vegetable", "vegan"], ["healthy", "fresh"])
+]
+
+# --- Compiled matchers (built once at import) ---
+
+SENTIMENT_MATCHER = KeywordMatcher(SENTIMENT_KEYWORDS)
+ATTRIBUTE_MATCHER = KeywordMatcher(ATTRIBUTE_KEYWORDS)
+CUISINE_MATCHER = KeywordMatcher({cuisine: [cuisine.lower()] for cuisine in CUISINE_ATTRIBUTES})
+# Dish names are matched by substring, so compound names hit too ("cheesecake", "beefsteak")
+DISH_NAME_MATCHER = KeywordMatcher({name: terms for name, terms, _ in DISH_NAME_RULES}, substring=True)
+GENERIC_NAME_MATCHER = KeywordMatcher({name: terms for name, terms, _ in GENERIC_NAME_RULES}, substring=True)
+
+def first_rule_attributes(matcher: KeywordMatcher, rules: List[Tuple[str, List[str], List[str]]], text: str) -> List[str]:
+    """
+    Attributes of the highest-priority rule whose terms appear in text, or [].
+    """
+    hits = matcher.find_all(text)
+    for name, _, attributes in rules:
+        if name in hits:
+            return list(attributes)
+    return []
@@ -0,0 +1,206 @@
+# mcp/local_classifier.py
+"""
+In-process dish attribute classifier.
+
+A TF-IDF + one-vs-rest logistic regression model, distilled from zero-shot
+outputs stored in dish_ai_artifacts. It scores all attribute categories for a
+whole batch of dishes with a single matrix product, so it can replace or
+front the remote zero-shot model.
+
+Train (after precompute.py has stored zero-shot attributes):
+    python local_classifier.py train [--output local_attribute_model.npz]
+"""
+import os
+import re
+import argparse
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase word unigrams plus adjacent-word bigrams.
+    """
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+class LocalAttributeClassifier:
+    """
+    Vectorized multi-label classifier over dish text.
+    """
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray, weights: np.ndarray, bias: np.ndarray, labels: List[str]):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.weights = weights  # (vocab, labels)
+        self.bias = bias        # (labels,)
+        self.labels = labels
+
+    def transform(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        L2-normalized TF-IDF matrix (texts x vocabulary).
+        """
+        matrix = np.zeros((len(texts), len(self.vocabulary)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                column = self.vocabulary.get(token)
+                if column is not None:
+                    matrix[row, column] += 1.0
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Probability of each label for each text (texts x labels).
+        """
+        logits = self.transform(texts) @ self.weights + self.bias
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def predict(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (probabilities, confidence) where confidence in [0, 1] is how far
+        the least certain label of each text sits from the 0.5 decision boundary.
+        """
+        probabilities = self.predict_proba(texts)
+        confidence = 2.0 * np.abs(probabilities - 0.5).min(axis=1)
+        return probabilities, confidence
+
+    def save(self, path: str):
+        tokens = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez_compressed(
+            path,
+            tokens=np.array(tokens),
+            idf=self.idf,
+            weights=self.weights,
+            bias=self.bias,
+            labels=np.array(self.labels)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LocalAttributeClassifier":
+        data = np.load(path, allow_pickle=False)
+        vocabulary = {str(token): index for index, token in enumerate(data["tokens"])}
+        return cls(vocabulary, data["idf"], data["weights"], data["bias"], [str(label) for label in data["labels"]])
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        targets: np.ndarray,
+        labels: List[str],
+        l2: float = 1e-3,
+        learning_rate: float = 2.0,
+        iterations: int = 500,
+        min_df: int = 1
+    ) -> "LocalAttributeClassifier":
+        """
+        Fit the model with full-batch gradient descent on (texts, texts x labels 0/1 targets).
+        """
+        document_frequency: Dict[str, int] = {}
+        for text in texts:
+            for token in set(tokenize(text)):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        tokens = sorted(token for token, count in document_frequency.items() if count >= min_df)
+        vocabulary = {token: index for index, token in enumerate(tokens)}
+        idf = np.array(
+            [np.log((1 + len(texts)) / (1 + document_frequency[token])) + 1.0 for token in tokens],
+            dtype=np.float32
+        )
+
+        model = cls(
+            vocabulary,
+            idf,
+            np.zeros((len(tokens), len(labels)), dtype=np.float32),
+            np.zeros(len(labels), dtype=np.float32),
+            labels
+        )
+        features = model.transform(texts)
+        targets = targets.astype(np.float32)
+        # Start from each label's base rate so rare labels are not over-predicted
+        base_rate = np.clip(targets.mean(axis=0), 1e-3, 1 - 1e-3)
+        model.bias = np.log(base_rate / (1 - base_rate)).astype(np.float32)
+
+        samples = max(1, len(texts))
+        for _ in range(iterations):
+            probabilities = 1.0 / (1.0 + np.exp(-(features @ model.weights + model.bias)))
+            error = probabilities - targets
+            model.weights -= learning_rate * (features.T @ error / samples + l2 * model.weights)
+            model.bias -= learning_rate * error.mean(axis=0)
+        return model
+
+def load_if_available(path: str) -> Optional[LocalAttributeClassifier]:
+    """
+    Load a trained model from path, or return None if it is missing or unreadable.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        model = LocalAttributeClassifier.load(path)
+        logger.info(f"Loaded local attribute classifier from {path} ({len(model.vocabulary)} features)")
+        return model
+    except Exception as e:
+        logger.error(f"Could not load local attribute classifier from {path}: {e}")
+        return None
+
+def load_training_data(conn, labels: List[str], descriptors: Dict[str, str]) -> Tuple[List[str], np.ndarray]:
+    """
+    Build (texts, targets) from zero-shot attributes stored in dish_ai_artifacts.
+    """
+    label_for_descriptor = {descriptor: label for label, descriptor in descriptors.items()}
+    label_index = {label: index for index, label in enumerate(labels)}
+    with conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT DISTINCT ON (a.dish_id) d.name, d.description, a.value
+            FROM dish_ai_artifacts a JOIN dishes d ON d.id = a.dish_id
+            WHERE a.artifact_type = 'attributes'
+            ORDER BY a.dish_id, a.created_at DESC
+            """
+        )
+        rows = cursor.fetchall()
+
+    texts = []
+    targets = np.zeros((len(rows), len(labels)), dtype=np.float32)
+    for row, (name, description, attributes) in enumerate(rows):
+        texts.append(f"{name}: {description or ''}")
+        for attribute in attributes or []:
+            label = label_for_descriptor.get(attribute, attribute)
+            if label in label_index:
+                targets[row, label_index[label]] = 1.0
+    return texts, targets
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local dish attribute classifier")
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("--output", default=os.getenv("AI_LOCAL_CLASSIFIER_PATH", "local_attribute_model.npz"))
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Imported here so the model itself has no service dependencies
+    import ai_models
+    from connections import connect_postgres
+
+    conn = connect_postgres()
+    try:
+        texts, targets = load_training_data(conn, ai_models.ATTRIBUTE_CATEGORIES, ai_models.ATTRIBUTE_DESCRIPTORS)
+    finally:
+        conn.close()
+    if not texts:
+        raise SystemExit("No zero-shot attributes found in dish_ai_artifacts; run precompute.py first")
+
+    model = LocalAttributeClassifier.train(texts, targets, ai_models.ATTRIBUTE_CATEGORIES, iterations=args.iterations)
+    probabilities = model.predict_proba(texts)
+    agreement = float(((probabilities > 0.5) == (targets > 0.5)).mean())
+    model.save(args.output)
+    logger.info(f"Trained on {len(texts)} dishes, training label agreement {agreement:.3f}, saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
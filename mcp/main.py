@@ -1,15 +1,30 @@
 # mcp/main.py
 import os
+import json
+import asyncio
 from dotenv import load_dotenv
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Iterable
+from datetime import datetime
 load_dotenv()
-from fastapi import FastAPI, Depends, HTTPException, status, Header, Body
+from fastapi import FastAPI, Depends, HTTPException, status, Header, Body, Request, Query
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from pydantic import BaseModel, ValidationError  # Import BaseModel and ValidationError
-from pymongo import MongoClient
-import psycopg2
+from pymongo import MongoClient, ReturnDocument, UpdateOne
 from psycopg2.extras import RealDictCursor
 import logging
+from contextlib import contextmanager
 import ai_models  # Import our new AI models module
+from pg_pool import PostgresPool, PoolTimeout  # Pooled PostgreSQL connections
+from artifacts import load_dish_artifacts  # Precomputed AI output (see precompute.py)
+from feedback_queue import FeedbackQueue  # Durable queue for accept-and-process AI feedback
+from interaction_log import InteractionLog, CONTEXT_PROJECTION  # Interaction history outside the context document
+from recommendation_cache import RecommendationCache, ContextVersions  # Context-versioned recommendation results
+from catalog import CatalogStore, CatalogSnapshot, parse_dietary_tags  # In-memory restaurant/dish snapshot
+from recommendation_query import fetch_recommendation_candidates  # Single round-trip candidate query
+from scoring import select_positions  # Vectorized ranking over the catalog snapshot
+from batch_recommend import parse_user_id, chunked, load_contexts, recommend_chunk, to_ndjson  # Many users per request
+from migrate import run_migrations  # Versioned schema migrations (mcp/migrations)
+from offload import run_blocking, run_blocking_bounded, shutdown_executor  # Run blocking drivers off the event loop
 
 app = FastAPI()
 
@@ -24,8 +39,33 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 POSTGRES_USER = os.getenv("POSTGRES_USER", "user")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "password")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "restaurants_db")
+POSTGRES_POOL_MIN = int(os.getenv("POSTGRES_POOL_MIN", "1"))
+POSTGRES_POOL_MAX = int(os.getenv("POSTGRES_POOL_MAX", "10"))
+POSTGRES_POOL_TIMEOUT = float(os.getenv("POSTGRES_POOL_TIMEOUT", "5"))  # Seconds to wait for a free connection
+POSTGRES_POOL_IDLE_CHECK = float(os.getenv("POSTGRES_POOL_IDLE_CHECK", "30"))  # Ping connections idle longer than this
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true"  # Apply pending schema migrations when the service starts
 MCP_API_KEY = os.getenv("MCP_API_KEY")
 HF_API_TOKEN = os.getenv("HF_API_KEY", "")  # Optional Hugging Face API key
+AI_ENRICHMENT_CONCURRENCY = int(os.getenv("AI_ENRICHMENT_CONCURRENCY", "8"))  # Max AI calls in flight per request
+AI_ARTIFACTS_ENABLED = os.getenv("AI_ARTIFACTS_ENABLED", "true").lower() == "true"  # Serve precomputed AI output when available
+AI_FEEDBACK_QUEUE = os.getenv("AI_FEEDBACK_QUEUE", "false").lower() == "true"  # Accept AI feedback with 202 and analyze it in the background
+AI_FEEDBACK_WORKERS = int(os.getenv("AI_FEEDBACK_WORKERS", "2"))  # Background feedback worker threads
+AI_FEEDBACK_BATCH_SIZE = int(os.getenv("AI_FEEDBACK_BATCH_SIZE", "16"))  # Feedback jobs claimed (and sentiment-analyzed) together
+INTERACTION_BULK_MAX_LINES = int(os.getenv("INTERACTION_BULK_MAX_LINES", "10000"))  # Max interactions per bulk ingest request
+RECOMMENDATION_CACHE_TTL = float(os.getenv("RECOMMENDATION_CACHE_TTL", "300"))  # Seconds a cached recommendation result is reused
+RECOMMENDATION_CACHE_MAX_ENTRIES = int(os.getenv("RECOMMENDATION_CACHE_MAX_ENTRIES", "10000"))
+RECOMMENDATION_VERSION_MAX_AGE = float(os.getenv("RECOMMENDATION_VERSION_MAX_AGE", "10"))  # Trust a remembered context version this long (other replicas may bump it)
+CATALOG_SNAPSHOT_ENABLED = os.getenv("CATALOG_SNAPSHOT_ENABLED", "true").lower() == "true"  # Serve catalog lookups from memory
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "60"))  # Seconds between catalog change checks
+INTERACTION_RECENT_WINDOW = int(os.getenv("INTERACTION_RECENT_WINDOW", "20"))  # Interactions kept in the user context document
+INTERACTION_HISTORY_TTL_DAYS = float(os.getenv("INTERACTION_HISTORY_TTL_DAYS", "0"))  # Expire logged interactions after this many days (0 keeps them)
+RECOMMENDATION_RESTAURANT_LIMIT = int(os.getenv("RECOMMENDATION_RESTAURANT_LIMIT", "15"))  # Top-scoring restaurants returned
+RECOMMENDATION_DISH_LIMIT = int(os.getenv("RECOMMENDATION_DISH_LIMIT", "50"))  # Top-scoring dishes returned
+BATCH_RECOMMENDATION_CHUNK_SIZE = int(os.getenv("BATCH_RECOMMENDATION_CHUNK_SIZE", "256"))  # Users loaded and scored together by the batch endpoint
+
+# Recommendation results per (user, context version, excluded items); context versions remembered in memory
+recommendation_cache = RecommendationCache(max_entries=RECOMMENDATION_CACHE_MAX_ENTRIES, ttl=RECOMMENDATION_CACHE_TTL)
+context_versions = ContextVersions(max_age=RECOMMENDATION_VERSION_MAX_AGE)
 # --- Pydantic Models for Request/Response ---
 class InitialPreferences(BaseModel):
    dietary_restrictions: List[str] = [] # e.g., ["vegetarian", "gluten-free"]
@@ -37,7 +77,9 @@ class UserContext(BaseModel):
    preferences: InitialPreferences
    # These will evolve as user interacts
    inferred_tastes: Dict[str, float] = {} # e.g., {"affinity_pasta": 0.7, "avoid_seafood": 0.9}
-   interaction_history: List[Dict] = [] # e.g., [{"item_id": "dish123", "type": "like", "timestamp": "..."}]
+   interaction_history: List[Dict] = [] # Most recent interactions only; the full history is in user_interactions
+   interaction_count: int = 0 # Interactions recorded in total
+   context_version: int = 0 # Incremented on every preference/interaction change; keys cached recommendations
 # Define a new model for restaurant recommendations
 class Restaurant(BaseModel):
     id: int
@@ -77,12 +119,18 @@ class EnhancedRecommendationResponse(RecommendationResponse):
     enhanced_dishes: List[EnhancedDish] = []
     ai_powered: bool = True
 
+class BatchRecommendationRequest(BaseModel):
+    user_ids: List[str]
+
 class Interaction(BaseModel):
     item_id: str
     item_type: str  # 'restaurant' or 'dish'
     interaction_type: str  # 'like' or 'dislike'
     timestamp: str
 
+class BulkInteraction(Interaction):
+    user_id: str
+
 # --- MCP API Key Authentication Dependency ---
 def get_api_key(api_key: str = Header(None, alias="X-MCP-API-Key")):
     print(f"API Key received: {api_key}")
@@ -100,23 +148,81 @@ async def startup_db_client():
    app.mongodb_client = MongoClient(MONGO_URI)
    app.mongodb = app.mongodb_client.get_database()
    print(f"Connected to MongoDB: {MONGO_URI}")
+   app.pg_pool = PostgresPool(
+       minconn=POSTGRES_POOL_MIN,
+       maxconn=POSTGRES_POOL_MAX,
+       acquire_timeout=POSTGRES_POOL_TIMEOUT,
+       idle_check_after=POSTGRES_POOL_IDLE_CHECK,
+       host=POSTGRES_HOST,
+       port=POSTGRES_PORT,
+       user=POSTGRES_USER,
+       password=POSTGRES_PASSWORD,
+       dbname=POSTGRES_DB
+   )
+   if DB_MIGRATE_ON_STARTUP:
+       try:
+           await run_blocking(apply_migrations)
+       except Exception as e:
+           # Queries still work without the indexes; the next start retries
+           print(f"Could not apply database migrations: {e}")
+   app.interaction_log = InteractionLog(
+       app.mongodb["user_contexts"],
+       app.mongodb["user_interactions"],
+       recent_window=INTERACTION_RECENT_WINDOW,
+       ttl_days=INTERACTION_HISTORY_TTL_DAYS
+   )
+   try:
+       app.interaction_log.ensure_indexes()
+   except Exception as e:
+       print(f"Could not create user context indexes: {e}")
+   app.feedback_queue = FeedbackQueue(
+       app.mongodb["feedback_jobs"],
+       process_feedback_jobs,
+       workers=AI_FEEDBACK_WORKERS,
+       batch_size=AI_FEEDBACK_BATCH_SIZE
+   )
+   app.feedback_queue.start()
+   app.catalog = CatalogStore(get_postgres_conn, refresh_interval=CATALOG_REFRESH_INTERVAL)
+   if CATALOG_SNAPSHOT_ENABLED:
+       app.catalog.start()
 @app.on_event("shutdown")
 async def shutdown_db_client():
+   app.catalog.stop()
+   app.feedback_queue.stop()
    app.mongodb_client.close()
    print("Closed MongoDB connection.")
+   app.pg_pool.closeall()
+   print("Closed PostgreSQL pool.")
+   ai_models.provider_client.close()
+   ai_models.refresher.shutdown()
+   shutdown_executor()
+@contextmanager
 def get_postgres_conn():
    try:
-       conn = psycopg2.connect(
-           host=POSTGRES_HOST,
-           port=POSTGRES_PORT,
-           user=POSTGRES_USER,
-           password=POSTGRES_PASSWORD,
-           dbname=POSTGRES_DB
-       )
-       return conn
+       conn = app.pg_pool.getconn()
+   except PoolTimeout as e:
+       print(f"PostgreSQL pool exhausted: {e}")
+       raise HTTPException(status_code=503, detail="Database busy, please retry")
    except Exception as e:
        print(f"Error connecting to PostgreSQL: {e}")
        raise HTTPException(status_code=500, detail="Database connection error")
+   try:
+       # Commits on success, rolls back on error; the connection itself stays open for reuse
+       with conn:
+           yield conn
+   finally:
+       app.pg_pool.putconn(conn)
+
+def apply_migrations():
+   with get_postgres_conn() as conn:
+       applied = run_migrations(conn)
+   if applied:
+       print(f"Applied database migrations: {', '.join(applied)}")
+
+def ping_postgres():
+   with get_postgres_conn() as conn:
+       with conn.cursor() as cursor:
+           cursor.execute("SELECT 1")
 
 # --- Endpoints ---
 # Health Check (from previous step)
@@ -125,22 +231,28 @@ async def health_check():
    mongo_status = "Disconnected"
    postgres_status = "Disconnected"
    try:
-       app.mongodb_client.admin.command('ping')
+       await run_blocking(app.mongodb_client.admin.command, 'ping')
        mongo_status = "Connected"
    except Exception as e:
        mongo_status = f"Failed: {e}"
    try:
-       with get_postgres_conn() as conn:
-           with conn.cursor() as cursor:
-               cursor.execute("SELECT 1")
-               postgres_status = "Connected"
+       await run_blocking(ping_postgres)
+       postgres_status = "Connected"
    except Exception as e:
        postgres_status = f"Failed: {e}"
    return {
        "status": "ok",
        "message": "MCP is running!",
        "mongodb_status": mongo_status,
-       "postgres_status": postgres_status
+       "postgres_status": postgres_status,
+       "postgres_pool": app.pg_pool.stats(),
+       "ai_provider_connections": ai_models.provider_client.stats(),
+       "ai_cache": ai_models.response_cache.stats(),
+       "ai_background_refresh": ai_models.refresher.stats(),
+       "ai_coalesced_calls": ai_models.ai_flights.stats(),
+       "ai_feedback_queue": app.feedback_queue.stats(),
+       "recommendation_cache": recommendation_cache.stats(),
+       "catalog": app.catalog.stats()
    }
 # New: Endpoint to create/update initial user context
 @app.post("/mcp/v1/context/user/{user_id}", response_model=UserContext)
@@ -172,12 +284,13 @@ async def create_or_update_user_context(
            preferences=initial_prefs,
            inferred_tastes={},
            interaction_history=[]
-       ).dict()
+       ).dict(exclude={"context_version", "interaction_count"})
        
-       # Insert or update the context in MongoDB
-       result = app.mongodb["user_contexts"].update_one(
+       # Insert or update the context in MongoDB; the version bump invalidates cached recommendations
+       result = await run_blocking(
+           app.mongodb["user_contexts"].update_one,
            {"user_id": user_id},
-           {"$set": user_context_doc},
+           {"$set": user_context_doc, "$inc": {"context_version": 1}},
            upsert=True
        )
        
@@ -187,7 +300,8 @@ async def create_or_update_user_context(
            logger.info(f"User context updated for {user_id}")
        
        # Retrieve the updated document to return
-       updated_context = app.mongodb["user_contexts"].find_one({"user_id": user_id})
+       updated_context = await run_blocking(app.mongodb["user_contexts"].find_one, {"user_id": user_id})
+       context_versions.set(user_id, updated_context.get("context_version", 0))
        return UserContext(**updated_context)
    
    except ValidationError as e:
@@ -211,11 +325,125 @@ async def create_or_update_user_context(
        raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
 # Function to get user context
-def get_user_context(user_id: str):
-    context = app.mongodb["user_contexts"].find_one({"user_id": user_id})
+# Recent interactions are only loaded when asked for; recommendations need preferences and tastes only
+async def get_user_context(user_id: str, with_history: bool = False):
+    projection = {"_id": 0} if with_history else CONTEXT_PROJECTION
+    context = await run_blocking(app.mongodb["user_contexts"].find_one, {"user_id": user_id}, projection)
     if not context:
         raise HTTPException(status_code=404, detail=f"User context not found for user {user_id}")
-    return UserContext(**context)
+    user_context = UserContext(**context)
+    context_versions.set(user_id, user_context.context_version)
+    return user_context
+
+# Query candidate restaurants and dishes for a user in one statement (blocking, runs in the offload pool)
+def query_recommendations(user_context: UserContext, excluded_ids: List[str]) -> Tuple[List[Restaurant], List[Dish]]:
+    preferences = user_context.preferences
+    with get_postgres_conn() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            candidates = fetch_recommendation_candidates(
+                cursor,
+                preferences.cuisine_preferences,
+                preferences.budget,
+                preferences.dietary_restrictions,
+                user_context.inferred_tastes,
+                excluded_ids,
+                RECOMMENDATION_RESTAURANT_LIMIT,
+                RECOMMENDATION_DISH_LIMIT
+            )
+    
+    if candidates["used_fallback"] and (preferences.cuisine_preferences or preferences.budget):
+        logger.info("No matching restaurants with filters, trying without filters")
+    if candidates["topped_up"]:
+        logger.info("Not enough dishes with exclusions, adding more options")
+    
+    restaurants = [Restaurant(**row) for row in candidates["restaurants"]]
+    dishes = [
+        Dish(**dict(row, dietary_tags=list(parse_dietary_tags(row["dietary_tags"]))))
+        for row in candidates["dishes"]
+    ]
+    return restaurants, dishes
+
+# Candidate filters as in query_recommendations, answered from the in-memory catalog snapshot;
+# candidates are ranked by a taste/preference score and the top ones kept
+def snapshot_recommendations(snapshot: CatalogSnapshot, user_context: UserContext, excluded_ids: List[str]) -> Tuple[List[Restaurant], List[Dish]]:
+    preferences = user_context.preferences
+    scorer = snapshot.scorer
+    
+    # One weight vector per user; every restaurant and dish is scored with a single matrix-vector product
+    weights = scorer.user_weights(
+        user_context.inferred_tastes,
+        preferences.cuisine_preferences,
+        preferences.dietary_restrictions,
+        preferences.budget
+    )
+    selected, dish_positions = select_positions(
+        snapshot.index,
+        preferences.dict(),
+        scorer.restaurant_features @ weights,
+        scorer.dish_features @ weights,
+        excluded_ids,
+        RECOMMENDATION_RESTAURANT_LIMIT,
+        RECOMMENDATION_DISH_LIMIT
+    )
+    restaurants = [Restaurant(**snapshot.restaurants[p].as_dict()) for p in selected]
+    dishes = [Dish(**snapshot.dishes[p].as_dict()) for p in dish_positions]
+    return restaurants, dishes
+
+def catalog_version() -> str:
+    snapshot = app.catalog.snapshot
+    return snapshot.version if snapshot is not None else ""
+
+# Build a user's recommendations, reusing the cached result for the same context version;
+# returns (response payload, etag)
+async def recommend_for_user(user_id: str, excluded_ids: List[str], use_cache: bool = True) -> Tuple[Dict, str]:
+    # Get user context
+    user_context = await get_user_context(user_id)
+    snapshot = app.catalog.snapshot
+    cache_key = RecommendationCache.key(
+        user_id, user_context.context_version, excluded_ids, snapshot.version if snapshot is not None else ""
+    )
+    etag = RecommendationCache.etag(cache_key)
+    if use_cache:
+        cached = recommendation_cache.get(cache_key)
+        if cached is not None:
+            return cached, etag
+    
+    if snapshot is not None:
+        # Scoring and model construction are CPU work; keep them off the event loop too
+        restaurants, dishes = await run_blocking(snapshot_recommendations, snapshot, user_context, excluded_ids)
+    else:
+        # Catalog not loaded yet: query PostgreSQL without blocking the event loop
+        restaurants, dishes = await run_blocking(query_recommendations, user_context, excluded_ids)
+    
+    # Calculate recommendation factors (for debug/visualization)
+    recommendation_factors = {
+        "cuisine_match": 0.8 if user_context.preferences.cuisine_preferences else 0.0,
+        "budget_match": 0.7 if user_context.preferences.budget else 0.0,
+        "dietary_match": 0.9 if user_context.preferences.dietary_restrictions else 0.0
+    }
+    
+    # If we have inferred tastes, add them as factors
+    for taste, value in user_context.inferred_tastes.items():
+        recommendation_factors[f"inferred_{taste}"] = value
+    
+    # Include the user context in the response for explanation purposes
+    payload = RecommendationResponse(
+        restaurants=restaurants,
+        dishes=dishes,
+        message=f"Generated {len(restaurants)} restaurant and {len(dishes)} dish recommendations for user {user_id}",
+        recommendation_factors=recommendation_factors,
+        user_context=user_context.dict()  # Add user context to response
+    ).dict()
+    recommendation_cache.set(cache_key, payload)
+    return payload, etag
+
+def parse_excluded_items(excluded_items: str) -> List[str]:
+    return [item.strip() for item in excluded_items.split(',') if item.strip()] if excluded_items else []
+
+# Recommendations as a model, for the AI endpoints built on top of them
+async def get_standard_recommendations(user_id: str, excluded_items: str = "", refresh: str = "false") -> RecommendationResponse:
+    payload, _ = await recommend_for_user(user_id, parse_excluded_items(excluded_items), refresh.lower() != "true")
+    return RecommendationResponse(**payload)
 
 # Updated recommendations endpoint
 @app.get("/mcp/v1/recommendations/user/{user_id}", response_model=RecommendationResponse)
@@ -223,187 +451,234 @@ async def get_recommendations(
     user_id: str, 
     excluded_items: str = "",
     refresh: str = "false",
-    api_key: str = Depends(get_api_key)
+    api_key: str = Depends(get_api_key),
+    if_none_match: Optional[str] = Header(None)
 ):
     logger.info(f"Generating recommendations for user {user_id}, excluded items: {excluded_items}")
     
-    try:
-        # Get user context
-        user_context = get_user_context(user_id)
-        
-        # Parse excluded items
-        excluded_ids = []
-        if excluded_items:
-            excluded_ids = [item.strip() for item in excluded_items.split(',')]
-            logger.info(f"Excluding items: {excluded_ids}")
-        
-        # Connect to PostgreSQL
-        with get_postgres_conn() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                # Base query
-                base_query = """
-                SELECT r.id, r.name, r.cuisine, r.description, r.price_range, r.location 
-                FROM restaurants r
-                """
-                
-                # Apply filters based on user preferences and excluded items
-                filters = []
-                params = []
-                
-                # Filter by cuisine preferences if present
-                if user_context.preferences.cuisine_preferences:
-                    cuisines_list = user_context.preferences.cuisine_preferences
-                    placeholders = ', '.join(['%s'] * len(cuisines_list))
-                    filters.append(f"r.cuisine IN ({placeholders})")
-                    params.extend(cuisines_list)
-                
-                # Filter by budget if present
-                if user_context.preferences.budget:
-                    filters.append("r.price_range = %s")
-                    params.append(user_context.preferences.budget)
-                
-                # Add WHERE clause if filters exist
-                if filters:
-                    base_query += " WHERE " + " AND ".join(filters)
-                
-                # Add ORDER BY clause to prioritize restaurants based on user's inferred tastes
-                # First get restaurants user has liked cuisines for
-                cuisines_liked = []
-                for taste, value in user_context.inferred_tastes.items():
-                    if taste.startswith("cuisine_") and value > 0.6:
-                        cuisine = taste.replace("cuisine_", "").title()
-                        cuisines_liked.append(cuisine)
-                
-                if cuisines_liked:
-                    if filters:
-                        base_query += " ORDER BY CASE"
-                        for i, cuisine in enumerate(cuisines_liked):
-                            base_query += f" WHEN r.cuisine = %s THEN {i+1}"
-                            params.append(cuisine)
-                        base_query += " ELSE 999 END"
-                
-                # Add LIMIT clause with a higher number
-                base_query += f" LIMIT 15"  # Increased limit to have more options
-                
-                # Execute the query
-                cursor.execute(base_query, params)
-                restaurant_rows = cursor.fetchall()
-                
-                # If we got no results with filters, try again without filters
-                if not restaurant_rows and filters:
-                    logger.info("No matching restaurants with filters, trying without filters")
-                    cursor.execute("SELECT r.id, r.name, r.cuisine, r.description, r.price_range, r.location FROM restaurants r LIMIT 10")
-                    restaurant_rows = cursor.fetchall()
-                
-                # Convert to Restaurant objects
-                restaurants = [Restaurant(**row) for row in restaurant_rows]
-                
-                # Get dishes, excluding any disliked ones
-                dish_query = """
-                SELECT d.id, d.restaurant_id, d.name, d.description, d.price, d.dietary_tags
-                FROM dishes d
-                WHERE d.restaurant_id = ANY(%s)
-                """
-                
-                # Add exclusion for disliked items
-                if excluded_ids:
-                    dish_query += " AND d.id::text NOT IN (" + ", ".join(["%s"] * len(excluded_ids)) + ")"
-                
-                restaurant_ids = [r.id for r in restaurants]
-                dish_params = [restaurant_ids]
-                
-                # Add excluded item params
-                if excluded_ids:
-                    dish_params.extend(excluded_ids)
-                
-                # Get dishes
-                dishes = []
-                if restaurant_ids:
-                    cursor.execute(dish_query, dish_params)
-                    dish_rows = cursor.fetchall()
-                    
-                    # Process dishes (similar to before)
-                    for row in dish_rows:
-                        # Convert dietary_tags from DB format to Python list
-                        if isinstance(row['dietary_tags'], list):
-                            dietary_tags = row['dietary_tags']
-                        else:
-                            # Handle case where it might be a string or other format
-                            dietary_tags = []
-                            if row['dietary_tags']:
-                                try:
-                                    # Try to parse as a PostgreSQL array format
-                                    tags_str = row['dietary_tags'].strip('{}')
-                                    if tags_str:
-                                        dietary_tags = tags_str.split(',')
-                                except:
-                                    pass
-                        
-                        # Update row with properly parsed dietary_tags
-                        row['dietary_tags'] = dietary_tags
-                        
-                        # Include dish if it matches dietary restrictions or we have no restrictions
-                        match_dietary = not user_context.preferences.dietary_restrictions or \
-                                      any(tag in user_context.preferences.dietary_restrictions for tag in dietary_tags)
-                        
-                        if match_dietary:
-                            dishes.append(Dish(**row))
-                
-                # Ensure we have enough dishes
-                if len(dishes) < 10 and restaurant_ids:
-                    # If we have too few dishes, fetch some more without the exclusions
-                    logger.info("Not enough dishes with exclusions, adding more options")
-                    simpler_query = """
-                    SELECT d.id, d.restaurant_id, d.name, d.description, d.price, d.dietary_tags
-                    FROM dishes d
-                    WHERE d.restaurant_id = ANY(%s)
-                    LIMIT 10
-                    """
-                    cursor.execute(simpler_query, [restaurant_ids])
-                    additional_rows = cursor.fetchall()
-                    
-                    # Only add dishes we don't already have
-                    existing_ids = {d.id for d in dishes}
-                    for row in additional_rows:
-                        if row['id'] not in existing_ids and str(row['id']) not in excluded_ids:
-                            # Process dietary tags
-                            if isinstance(row['dietary_tags'], list):
-                                dietary_tags = row['dietary_tags']
-                            else:
-                                dietary_tags = []
-                                if row['dietary_tags']:
-                                    try:
-                                        tags_str = row['dietary_tags'].strip('{}')
-                                        if tags_str:
-                                            dietary_tags = tags_str.split(',')
-                                    except:
-                                        pass
-                            row['dietary_tags'] = dietary_tags
-                            dishes.append(Dish(**row))
-                
-                # Calculate recommendation factors (for debug/visualization)
-                recommendation_factors = {
-                    "cuisine_match": 0.8 if user_context.preferences.cuisine_preferences else 0.0,
-                    "budget_match": 0.7 if user_context.preferences.budget else 0.0,
-                    "dietary_match": 0.9 if user_context.preferences.dietary_restrictions else 0.0
-                }
-                
-                # If we have inferred tastes, add them as factors
-                for taste, value in user_context.inferred_tastes.items():
-                    recommendation_factors[f"inferred_{taste}"] = value
-                
-                # Include the user context in the response for explanation purposes
-                return RecommendationResponse(
-                    restaurants=restaurants,
-                    dishes=dishes,
-                    message=f"Generated {len(restaurants)} restaurant and {len(dishes)} dish recommendations for user {user_id}",
-                    recommendation_factors=recommendation_factors,
-                    user_context=user_context.dict()  # Add user context to response
-                )
+    # Parse excluded items
+    excluded_ids = parse_excluded_items(excluded_items)
+    if excluded_ids:
+        logger.info(f"Excluding items: {excluded_ids}")
+    use_cache = refresh.lower() != "true"
     
+    # A context version this process already knows answers a conditional request without any DB work
+    known_version = context_versions.get(user_id)
+    if use_cache and known_version is not None:
+        etag = RecommendationCache.etag(RecommendationCache.key(user_id, known_version, excluded_ids, catalog_version()))
+        if RecommendationCache.matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+    
+    try:
+        payload, etag = await recommend_for_user(user_id, excluded_ids, use_cache)
     except Exception as e:
         logger.error(f"Error generating recommendations for user {user_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
+    
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if RecommendationCache.matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=payload, headers=headers)
+
+# Recommendations for many users at once, streamed back as NDJSON (one line per user, in request order).
+# Body: {"user_ids": [...]} as JSON, or one user id (or {"user_id": ...} object) per line.
+@app.post("/mcp/v1/recommendations/batch")
+async def get_batch_recommendations(request: Request, api_key: str = Depends(get_api_key)):
+    try:
+        if "application/json" in request.headers.get("content-type", ""):
+            user_ids = BatchRecommendationRequest(**(await request.json())).user_ids
+        else:
+            body = (await request.body()).decode("utf-8")
+            user_ids = [user_id for user_id in map(parse_user_id, body.splitlines()) if user_id]
+    except (ValueError, TypeError, ValidationError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch request: {str(e)}")
+    logger.info(f"Generating batch recommendations for {len(user_ids)} users")
+    
+    # Batch scoring always runs against a snapshot; load one on demand if the background refresh has not yet
+    try:
+        if app.catalog.snapshot is None:
+            await run_blocking(app.catalog.refresh, True)
+        snapshot = app.catalog.snapshot
+    except Exception as e:
+        logger.error(f"Error loading catalog for batch recommendations: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
+    
+    # One Mongo query and one users x items scoring pass per chunk, all off the event loop
+    def recommend(chunk: List[str]) -> str:
+        contexts = load_contexts(app.mongodb["user_contexts"], chunk)
+        results = recommend_chunk(snapshot, contexts, chunk, RECOMMENDATION_RESTAURANT_LIMIT, RECOMMENDATION_DISH_LIMIT)
+        return "".join(to_ndjson(result) for result in results)
+    
+    async def lines():
+        for chunk in chunked(user_ids, BATCH_RECOMMENDATION_CHUNK_SIZE):
+            try:
+                yield await run_blocking(recommend, chunk)
+            except Exception as e:
+                logger.error(f"Error generating batch recommendations: {str(e)}")
+                yield "".join(to_ndjson({"user_id": user_id, "error": str(e)}) for user_id in chunk)
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"Cache-Control": "no-cache"})
+
+# Look up precomputed AI artifacts for a page of dishes (blocking, runs in the offload pool)
+def fetch_precomputed_artifacts(dish_ids: List[int], dietary_restrictions: List[str]) -> Dict[int, Dict]:
+    try:
+        with get_postgres_conn() as conn:
+            return load_dish_artifacts(
+                conn,
+                dish_ids,
+                ai_models.dietary_segment(dietary_restrictions),
+                ai_models.artifact_version("description"),
+                ai_models.artifact_version("attributes")
+            )
+    except Exception as e:
+        # Missing table or DB hiccup: fall back to computing on the request path
+        logger.warning(f"Could not load precomputed AI artifacts: {e}")
+        return {}
+
+# Describe a chunk of dishes with one batched completion; returns {dish_id: description} for the ones that succeeded
+async def describe_dishes_batch(
+    dishes: List[Dish],
+    restaurants_by_id: Dict[int, Restaurant],
+    user_preferences: Dict,
+    limiter: asyncio.Semaphore
+) -> Dict[int, str]:
+    items = [
+        {"name": dish.name, "cuisine": restaurants_by_id[dish.restaurant_id].cuisine if dish.restaurant_id in restaurants_by_id else "delicious"}
+        for dish in dishes
+    ]
+    try:
+        descriptions = await run_blocking_bounded(
+            limiter,
+            ai_models.generate_personalized_descriptions_batch,
+            items,
+            user_preferences
+        )
+    except Exception as e:
+        logger.warning(f"Batched description request failed, using per-dish calls: {e}")
+        return {}
+    return {dish.id: description for dish, description in zip(dishes, descriptions) if description}
+
+# Classify a chunk of dishes with one zero-shot request; returns {dish_id: attributes}
+async def classify_dishes_batch(dishes: List[Dish], limiter: asyncio.Semaphore) -> Dict[int, List[str]]:
+    items = [{"name": dish.name, "description": dish.description} for dish in dishes]
+    try:
+        attributes = await run_blocking_bounded(limiter, ai_models.classify_dish_attributes_batch, items)
+    except Exception as e:
+        logger.warning(f"Batched classification failed, using per-dish calls: {e}")
+        return {}
+    return {dish.id: dish_attributes for dish, dish_attributes in zip(dishes, attributes) if dish_attributes}
+
+# Generate the AI description and attributes for one dish (both calls run concurrently)
+async def enrich_dish(
+    dish: Dish,
+    restaurant: Optional[Restaurant],
+    user_preferences: Dict,
+    limiter: asyncio.Semaphore,
+    precomputed: Optional[Dict] = None,
+    batch_descriptions: Optional[asyncio.Future] = None,
+    batch_attributes: Optional[asyncio.Future] = None
+) -> EnhancedDish:
+    cuisine = restaurant.cuisine if restaurant else "delicious"
+    precomputed = precomputed or {}
+    
+    async def describe():
+        if precomputed.get("description"):
+            return precomputed["description"]
+        # Shared batched completion for this dish's chunk; fall through to the per-dish call if it skipped us
+        if batch_descriptions is not None:
+            description = (await batch_descriptions).get(dish.id)
+            if description:
+                return description
+        return await run_blocking_bounded(
+            limiter,
+            ai_models.generate_personalized_description,
+            dish_name=dish.name,
+            cuisine=cuisine,
+            user_preferences=user_preferences
+        )
+    
+    async def classify():
+        if precomputed.get("attributes"):
+            return precomputed["attributes"]
+        if batch_attributes is not None:
+            attributes = (await batch_attributes).get(dish.id)
+            if attributes:
+                return attributes
+        return await run_blocking_bounded(
+            limiter,
+            ai_models.classify_dish_attributes,
+            dish_name=dish.name,
+            dish_description=dish.description
+        )
+    
+    ai_description, ai_attributes = await asyncio.gather(describe(), classify())
+    
+    return EnhancedDish(
+        id=dish.id,
+        restaurant_id=dish.restaurant_id,
+        name=dish.name,
+        description=dish.description,
+        ai_description=ai_description,
+        ai_attributes=ai_attributes,
+        price=dish.price,
+        dietary_tags=dish.dietary_tags
+    )
+
+# Start enriching every dish of a recommendation page; returns one task per dish, in page order,
+# and the batched description/attribute tasks those dish tasks wait on
+async def start_dish_enrichment(standard_recs: RecommendationResponse, user_context: UserContext) -> Tuple[List[asyncio.Future], List[asyncio.Future]]:
+    # Enhance all dishes concurrently, capped at AI_ENRICHMENT_CONCURRENCY calls in flight
+    limiter = asyncio.Semaphore(AI_ENRICHMENT_CONCURRENCY)
+    restaurants_by_id = {r.id: r for r in standard_recs.restaurants}
+    user_preferences = user_context.preferences.dict()
+    
+    # Precomputed artifacts turn most of the enrichment into a single lookup
+    precomputed = {}
+    if AI_ARTIFACTS_ENABLED and standard_recs.dishes:
+        precomputed = await run_blocking(
+            fetch_precomputed_artifacts,
+            [dish.id for dish in standard_recs.dishes],
+            user_context.preferences.dietary_restrictions
+        )
+    
+    # Describe the remaining dishes in batched completions (AI_DESCRIPTION_BATCH_SIZE=1 disables batching)
+    batch_tasks = []
+    description_tasks = {}
+    batch_size = ai_models.DESCRIPTION_BATCH_SIZE
+    if batch_size > 1:
+        undescribed = [dish for dish in standard_recs.dishes if not precomputed.get(dish.id, {}).get("description")]
+        for start in range(0, len(undescribed), batch_size):
+            chunk = undescribed[start:start + batch_size]
+            task = asyncio.ensure_future(describe_dishes_batch(chunk, restaurants_by_id, user_preferences, limiter))
+            batch_tasks.append(task)
+            for dish in chunk:
+                description_tasks[dish.id] = task
+    
+    # Classify the remaining dishes in batched zero-shot requests (AI_ATTRIBUTE_BATCH_SIZE=1 disables batching)
+    attribute_tasks = {}
+    batch_size = ai_models.ATTRIBUTE_BATCH_SIZE
+    if batch_size > 1:
+        unclassified = [dish for dish in standard_recs.dishes if not precomputed.get(dish.id, {}).get("attributes")]
+        for start in range(0, len(unclassified), batch_size):
+            chunk = unclassified[start:start + batch_size]
+            task = asyncio.ensure_future(classify_dishes_batch(chunk, limiter))
+            batch_tasks.append(task)
+            for dish in chunk:
+                attribute_tasks[dish.id] = task
+    
+    dish_tasks = [
+        asyncio.ensure_future(enrich_dish(
+            dish,
+            restaurants_by_id.get(dish.restaurant_id),
+            user_preferences,
+            limiter,
+            precomputed.get(dish.id),
+            description_tasks.get(dish.id),
+            attribute_tasks.get(dish.id)
+        ))
+        for dish in standard_recs.dishes
+    ]
+    return dish_tasks, batch_tasks
 
 # AI-enhanced recommendations endpoint
 @app.get("/mcp/v1/ai-recommendations/user/{user_id}", response_model=EnhancedRecommendationResponse)
@@ -417,45 +692,13 @@ async def get_ai_recommendations(
     
     try:
         # Get the standard recommendations first
-        standard_recs = await get_recommendations(user_id, excluded_items, refresh, api_key)
+        standard_recs = await get_standard_recommendations(user_id, excluded_items, refresh)
         
         # Get user context
-        user_context = get_user_context(user_id)
-        
-        # Enhance dishes with AI-generated descriptions and attributes
-        enhanced_dishes = []
+        user_context = await get_user_context(user_id)
         
-        for dish in standard_recs.dishes:
-            # Get the restaurant for this dish
-            restaurant = next((r for r in standard_recs.restaurants if r.id == dish.restaurant_id), None)
-            cuisine = restaurant.cuisine if restaurant else "delicious"
-            
-            # Generate AI-enhanced description
-            ai_description = ai_models.generate_personalized_description(
-                dish_name=dish.name,
-                cuisine=cuisine,
-                user_preferences=user_context.preferences.dict()
-            )
-            
-            # Classify dish attributes
-            ai_attributes = ai_models.classify_dish_attributes(
-                dish_name=dish.name,
-                dish_description=dish.description
-            )
-            
-            # Create enhanced dish
-            enhanced_dish = EnhancedDish(
-                id=dish.id,
-                restaurant_id=dish.restaurant_id,
-                name=dish.name,
-                description=dish.description,
-                ai_description=ai_description,
-                ai_attributes=ai_attributes,
-                price=dish.price,
-                dietary_tags=dish.dietary_tags
-            )
-            
-            enhanced_dishes.append(enhanced_dish)
+        dish_tasks, _ = await start_dish_enrichment(standard_recs, user_context)
+        enhanced_dishes = await asyncio.gather(*dish_tasks)
         
         # Create and return enhanced response
         return EnhancedRecommendationResponse(
@@ -472,15 +715,92 @@ async def get_ai_recommendations(
         logger.error(f"Error generating AI-enhanced recommendations for user {user_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating AI-enhanced recommendations: {str(e)}")
 
+# Streaming AI-enhanced recommendations: the standard recommendations first, then each dish as it is enriched
+@app.get("/mcp/v1/ai-recommendations/user/{user_id}/stream")
+async def stream_ai_recommendations(
+    user_id: str,
+    excluded_items: str = "",
+    refresh: str = "false",
+    stream_format: str = Query("ndjson", alias="format"),  # "ndjson" or "sse"
+    api_key: str = Depends(get_api_key)
+):
+    logger.info(f"Streaming AI-enhanced recommendations for user {user_id}")
+    
+    # Errors here (unknown user, DB down) still surface as a normal HTTP error before streaming starts
+    standard_recs = await get_standard_recommendations(user_id, excluded_items, refresh)
+    user_context = await get_user_context(user_id)
+    use_sse = stream_format.lower() == "sse"
+    
+    def encode(event: str, data) -> str:
+        payload = json.dumps(data, default=str)
+        if use_sse:
+            return f"event: {event}\ndata: {payload}\n\n"
+        return json.dumps({"event": event, "data": data}, default=str) + "\n"
+    
+    async def events():
+        # First event needs only the DB query, so the client can render right away
+        yield encode("recommendations", standard_recs.dict())
+        dish_tasks, batch_tasks = await start_dish_enrichment(standard_recs, user_context)
+        try:
+            enriched = 0
+            for next_done in asyncio.as_completed(dish_tasks):
+                try:
+                    enhanced_dish = await next_done
+                except Exception as e:
+                    logger.error(f"Error enriching dish for user {user_id}: {str(e)}")
+                    yield encode("error", {"detail": f"Error enriching dish: {str(e)}"})
+                    continue
+                enriched += 1
+                yield encode("dish", enhanced_dish.dict())
+            yield encode("done", {"enhanced_dishes": enriched, "ai_powered": True})
+        finally:
+            # Client went away: stop any enrichment still in flight, including the shared batch calls
+            for task in dish_tasks + batch_tasks:
+                task.cancel()
+    
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+# Turn a sentiment result into the like/dislike interaction it implies
+def interaction_from_feedback(feedback: Dict, sentiment_result: Dict) -> Interaction:
+    return Interaction(
+        item_id=feedback.get("item_id", ""),
+        item_type=feedback.get("item_type", ""),
+        interaction_type="like" if sentiment_result["sentiment"] == "POSITIVE" else "dislike",
+        timestamp=feedback.get("timestamp", "") or datetime.now().isoformat()
+    )
+
+# Feedback queue handler: analyze a batch of queued feedback together, then apply each interaction (blocking)
+def process_feedback_jobs(jobs: List[Dict]) -> List:
+    sentiments = ai_models.analyze_feedback_sentiment_batch([job["payload"]["feedback_text"] for job in jobs])
+    outcomes = []
+    for job, sentiment_result in zip(jobs, sentiments):
+        try:
+            interaction = interaction_from_feedback(job["payload"], sentiment_result)
+            if apply_interaction(job["user_id"], interaction) is None:
+                raise ValueError(f"User context not found for user {job['user_id']}")
+            outcomes.append({
+                "sentiment_analysis": sentiment_result,
+                "derived_interaction": interaction.dict(),
+                "context_updated": True
+            })
+        except Exception as e:
+            logger.error(f"Error applying queued feedback {job['_id']} for user {job['user_id']}: {str(e)}")
+            outcomes.append(e)
+    return outcomes
+
 # AI-powered sentiment analysis for user feedback
 @app.post("/mcp/v1/context/user/{user_id}/ai-feedback")
 async def analyze_user_feedback(
     user_id: str,
     feedback: dict = Body(...),
+    queue: Optional[bool] = None,  # Defaults to AI_FEEDBACK_QUEUE
     api_key: str = Depends(get_api_key)
 ):
     """
     Analyze user feedback using sentiment analysis and update user context.
+    In queue mode the feedback is stored and 202 is returned with a job id;
+    the result is available from the feedback job status endpoint.
     """
     logger.info(f"Analyzing feedback for user {user_id}")
     
@@ -493,19 +813,26 @@ async def analyze_user_feedback(
         if not feedback_text or not item_id or not item_type:
             raise HTTPException(status_code=400, detail="Missing required feedback data")
         
-        # Analyze sentiment
-        sentiment_result = ai_models.analyze_feedback_sentiment(feedback_text)
+        if AI_FEEDBACK_QUEUE if queue is None else queue:
+            payload = {
+                "feedback_text": feedback_text,
+                "item_id": str(item_id),
+                "item_type": item_type,
+                "timestamp": feedback.get("timestamp", "") or datetime.now().isoformat()
+            }
+            job_id = await run_blocking(app.feedback_queue.enqueue, user_id, payload)
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={
+                "message": f"Feedback accepted for AI analysis for user {user_id}",
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/mcp/v1/context/user/{user_id}/ai-feedback/{job_id}"
+            })
         
-        # Create interaction based on sentiment
-        interaction_type = "like" if sentiment_result["sentiment"] == "POSITIVE" else "dislike"
+        # Analyze sentiment
+        sentiment_result = await run_blocking(ai_models.analyze_feedback_sentiment, feedback_text)
         
-        # Create interaction object
-        interaction = Interaction(
-            item_id=item_id,
-            item_type=item_type,
-            interaction_type=interaction_type,
-            timestamp=feedback.get("timestamp", "") or datetime.now().isoformat()
-        )
+        # Create interaction object based on sentiment
+        interaction = interaction_from_feedback(feedback, sentiment_result)
         
         # Use existing interaction endpoint to update user context
         interaction_result = await user_interaction(user_id, interaction, api_key)
@@ -522,6 +849,143 @@ async def analyze_user_feedback(
         logger.error(f"Error analyzing feedback for user {user_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error analyzing feedback: {str(e)}")
 
+# Status and result of a queued AI feedback job
+@app.get("/mcp/v1/context/user/{user_id}/ai-feedback/{job_id}")
+async def get_feedback_job(user_id: str, job_id: str, api_key: str = Depends(get_api_key)):
+    try:
+        job = await run_blocking(app.feedback_queue.get, job_id)
+    except Exception as e:
+        logger.error(f"Error retrieving feedback job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving feedback job: {str(e)}")
+    if not job or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail=f"Feedback job {job_id} not found for user {user_id}")
+    
+    response = {
+        "job_id": job["job_id"],
+        "status": job["status"],  # queued, processing, done or failed
+        "attempts": job.get("attempts", 0),
+        "created_at": job["created_at"].isoformat(),
+        "updated_at": job["updated_at"].isoformat()
+    }
+    if job["status"] == "done":
+        response.update(job["result"])
+    elif job.get("error"):
+        response["error"] = job["error"]
+    return response
+
+# Resolve interacted items to (cuisine, dietary tags), from the catalog snapshot when possible and
+# with one catalog query for the rest (blocking). Returns {(item_type, item_id): (cuisine, tags)} for known items.
+def resolve_items_tastes(items: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], Tuple[str, Tuple[str, ...]]]:
+    resolved = {}
+    missing = set()
+    snapshot = app.catalog.snapshot
+    for item_type, item_id in set(items):
+        if snapshot is not None:
+            if item_type == "restaurant":
+                restaurant = snapshot.restaurants_by_id.get(item_id)
+                if restaurant is not None:
+                    resolved[(item_type, item_id)] = (restaurant.cuisine, ())
+                    continue
+            else:
+                dish = snapshot.dishes_by_id.get(item_id)
+                cuisine = snapshot.dish_cuisine(dish) if dish is not None else None
+                if cuisine is not None:
+                    resolved[(item_type, item_id)] = (cuisine, dish.dietary_tags)
+                    continue
+        missing.add((item_type, item_id))
+    if not missing:
+        return resolved
+    
+    # Not in the snapshot (not loaded yet, or added since the last reload)
+    with get_postgres_conn() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(
+                """
+                SELECT 'restaurant' AS item_type, r.id, r.cuisine, NULL::text[] AS dietary_tags
+                FROM restaurants r WHERE r.id = ANY(%s::int[])
+                UNION ALL
+                SELECT 'dish' AS item_type, d.id, r.cuisine, d.dietary_tags
+                FROM dishes d JOIN restaurants r ON d.restaurant_id = r.id WHERE d.id = ANY(%s::int[])
+                """,
+                (
+                    [item_id for item_type, item_id in missing if item_type == "restaurant"],
+                    [item_id for item_type, item_id in missing if item_type == "dish"]
+                )
+            )
+            for row in cursor.fetchall():
+                resolved[(row["item_type"], row["id"])] = (row["cuisine"], parse_dietary_tags(row["dietary_tags"]))
+    return resolved
+
+def resolve_item_tastes(item_type: str, item_id: int) -> Optional[Tuple[str, Tuple[str, ...]]]:
+    return resolve_items_tastes([(item_type, item_id)]).get((item_type, item_id))
+
+# The catalog item an interaction refers to, as (item_type, item_id), or None if it has none
+def interaction_item(interaction: Interaction) -> Optional[Tuple[str, int]]:
+    if interaction.item_type not in ("restaurant", "dish"):
+        return None
+    try:
+        # Safely convert item_id to integer and handle any errors
+        return interaction.item_type, int(interaction.item_id)
+    except ValueError:
+        # Handle the case where item_id is not a valid integer; the interaction is still recorded
+        logger.error(f"Invalid {interaction.item_type} ID format: {interaction.item_id}")
+        return None
+
+# Learned-taste deltas implied by liking/disliking an item: {"cuisine_x": +/-0.1, "prefers_y": +/-0.1}
+def taste_deltas(interaction_type: str, item: Optional[Tuple[str, Tuple[str, ...]]]) -> Dict[str, float]:
+    if not item:
+        return {}
+    # This is simplified logic - in a real app, you'd have more sophisticated preference learning
+    if interaction_type == "like":
+        factor = 0.1  # Increase preference
+    else:  # dislike
+        factor = -0.1  # Decrease preference
+    
+    # The item's cuisine, and for a dish its dietary tags too
+    cuisine, dietary_tags = item
+    deltas = {f"cuisine_{cuisine.lower()}": factor}
+    for tag in dietary_tags:
+        deltas[f"prefers_{tag.replace('-', '_')}"] = factor
+    return deltas
+
+def interaction_taste_deltas(interaction: Interaction) -> Dict[str, float]:
+    item = interaction_item(interaction)
+    return taste_deltas(interaction.interaction_type, resolve_item_tastes(*item) if item else None)
+
+# Update-pipeline $set fields adding deltas to inferred tastes, each starting at 0.5 and kept between 0 and 1
+def taste_update_fields(deltas: Dict[str, float]) -> Dict:
+    return {
+        f"inferred_tastes.{key}": {
+            "$min": [1.0, {"$max": [0.0, {"$add": [{"$ifNull": [f"$inferred_tastes.{key}", 0.5]}, delta]}]}]
+        }
+        for key, delta in deltas.items()
+        # Keys become field paths, so skip anything that is not a plain name
+        if "." not in key and "$" not in key
+    }
+
+# Record an interaction and update inferred tastes (blocking, runs in the offload pool).
+# Tastes, the recent-interactions window and the context version change in one atomic update,
+# so concurrent interactions never overwrite each other. Returns None if the user has no context.
+def apply_interaction(user_id: str, interaction: Interaction) -> Optional[Dict]:
+    interaction_dict = interaction.dict()
+    fields = taste_update_fields(interaction_taste_deltas(interaction))
+    fields.update(app.interaction_log.history_fields([interaction_dict]))
+    fields["context_version"] = {"$add": [{"$ifNull": ["$context_version", 0]}, 1]}
+    
+    updated = app.mongodb["user_contexts"].find_one_and_update(
+        {"user_id": user_id},
+        [{"$set": fields}],
+        projection={"context_version": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not updated:
+        return None
+    context_versions.set(user_id, updated["context_version"])
+    
+    # Full history goes to the interaction log
+    app.interaction_log.log(user_id, [interaction_dict])
+    return interaction_dict
+
 # Updated interaction endpoint to update user context
 @app.post("/mcp/v1/context/user/{user_id}/interact")
 async def user_interaction(
@@ -532,96 +996,10 @@ async def user_interaction(
     logger.info(f"Recording interaction for user {user_id}: {interaction}")
     
     try:
-        # Get user context
-        user_context = get_user_context(user_id)
-        
-        # Add interaction to history
-        interaction_dict = interaction.dict()
-        
-        # Update interaction history
-        app.mongodb["user_contexts"].update_one(
-            {"user_id": user_id},
-            {"$push": {"interaction_history": interaction_dict}}
-        )
-        
-        # Update inferred tastes based on interaction
-        # This is simplified logic - in a real app, you'd have more sophisticated preference learning
-        if interaction.interaction_type == "like":
-            factor = 0.1  # Increase preference
-        else:  # dislike
-            factor = -0.1  # Decrease preference
-        
-        # Get item details to update preferences
-        if interaction.item_type == "restaurant":
-            # Update restaurant cuisine preference
-            with get_postgres_conn() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    try:
-                        # Safely convert item_id to integer and handle any errors
-                        item_id_int = int(interaction.item_id)
-                        
-                        cursor.execute(
-                            "SELECT cuisine FROM restaurants WHERE id = %s",
-                            (item_id_int,)
-                        )
-                        result = cursor.fetchone()
-                        if result:
-                            cuisine = result["cuisine"]
-                            
-                            # Update inferred taste for this cuisine
-                            taste_key = f"cuisine_{cuisine.lower()}"
-                            current_value = user_context.inferred_tastes.get(taste_key, 0.5)
-                            new_value = max(0.0, min(1.0, current_value + factor))  # Keep between 0 and 1
-                            
-                            app.mongodb["user_contexts"].update_one(
-                                {"user_id": user_id},
-                                {"$set": {f"inferred_tastes.{taste_key}": new_value}}
-                            )
-                    except ValueError as e:
-                        # Handle the case where item_id is not a valid integer
-                        logger.error(f"Invalid restaurant ID format: {interaction.item_id}")
-                        # We'll continue without updating inferred tastes
-        
-        elif interaction.item_type == "dish":
-            # Update dish preference
-            with get_postgres_conn() as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    try:
-                        # Safely convert item_id to integer and handle any errors
-                        item_id_int = int(interaction.item_id)
-                        
-                        cursor.execute(
-                            "SELECT d.name, d.dietary_tags, r.cuisine FROM dishes d JOIN restaurants r ON d.restaurant_id = r.id WHERE d.id = %s",
-                            (item_id_int,)
-                        )
-                        result = cursor.fetchone()
-                        if result:
-                            # Update cuisine preference
-                            cuisine = result["cuisine"]
-                            taste_key = f"cuisine_{cuisine.lower()}"
-                            current_value = user_context.inferred_tastes.get(taste_key, 0.5)
-                            new_value = max(0.0, min(1.0, current_value + factor))
-                            
-                            app.mongodb["user_contexts"].update_one(
-                                {"user_id": user_id},
-                                {"$set": {f"inferred_tastes.{taste_key}": new_value}}
-                            )
-                            
-                            # If dish has dietary tags, update those preferences too
-                            if result["dietary_tags"]:
-                                for tag in result["dietary_tags"]:
-                                    tag_key = f"prefers_{tag.replace('-', '_')}"  # Fixed missing closing quote
-                                    current_value = user_context.inferred_tastes.get(tag_key, 0.5)
-                                    new_value = max(0.0, min(1.0, current_value + factor))
-                                    
-                                    app.mongodb["user_contexts"].update_one(
-                                        {"user_id": user_id},
-                                        {"$set": {f"inferred_tastes.{tag_key}": new_value}}
-                                    )
-                    except ValueError as e:
-                        # Handle the case where item_id is not a valid integer
-                        logger.error(f"Invalid dish ID format: {interaction.item_id}")
-                        # We'll continue without updating inferred tastes
+        # Write the interaction and taste updates without blocking the event loop
+        interaction_dict = await run_blocking(apply_interaction, user_id, interaction)
+        if interaction_dict is None:
+            raise HTTPException(status_code=404, detail=f"User context not found for user {user_id}")
         
         return {
             "message": f"Interaction recorded for user {user_id}",
@@ -633,6 +1011,102 @@ async def user_interaction(
         logger.error(f"Error recording interaction for user {user_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error recording interaction: {str(e)}")
 
+# Apply many users' interactions: one catalog lookup for all items, taste deltas summed per user,
+# and one bulk write with an atomic update per user (blocking, runs in the offload pool)
+def ingest_interactions(interactions: List[BulkInteraction]) -> Dict:
+    items = [interaction_item(interaction) for interaction in interactions]
+    tastes = resolve_items_tastes(item for item in items if item)
+    
+    deltas_by_user: Dict[str, Dict[str, float]] = {}
+    history_by_user: Dict[str, List[Dict]] = {}
+    for interaction, item in zip(interactions, items):
+        user_deltas = deltas_by_user.setdefault(interaction.user_id, {})
+        for key, delta in taste_deltas(interaction.interaction_type, tastes.get(item) if item else None).items():
+            user_deltas[key] = user_deltas.get(key, 0.0) + delta
+        history_by_user.setdefault(interaction.user_id, []).append(interaction.dict(exclude={"user_id"}))
+    
+    contexts = app.mongodb["user_contexts"]
+    known_users = {
+        doc["user_id"] for doc in contexts.find({"user_id": {"$in": list(history_by_user)}}, {"_id": 0, "user_id": 1})
+    }
+    operations = []
+    for user_id in known_users:
+        fields = taste_update_fields(deltas_by_user[user_id])
+        fields.update(app.interaction_log.history_fields(history_by_user[user_id]))
+        fields["context_version"] = {"$add": [{"$ifNull": ["$context_version", 0]}, 1]}
+        operations.append(UpdateOne({"user_id": user_id}, [{"$set": fields}]))
+    if operations:
+        contexts.bulk_write(operations, ordered=False)
+        app.interaction_log.log_batch({user_id: history_by_user[user_id] for user_id in known_users})
+    # New versions were not read back; the next request for these users reads them from MongoDB
+    for user_id in known_users:
+        context_versions.forget(user_id)
+    
+    unknown_users = sorted(set(history_by_user) - known_users)
+    return {
+        "applied": sum(len(history_by_user[user_id]) for user_id in known_users),
+        "users_updated": len(known_users),
+        "unknown_users": unknown_users
+    }
+
+# Bulk interaction ingest (replays, partner imports): NDJSON, one {"user_id", "item_id", "item_type",
+# "interaction_type", "timestamp"} object per line, or a JSON array of them. Invalid lines are reported and skipped.
+@app.post("/mcp/v1/context/interactions/bulk")
+async def bulk_user_interactions(request: Request, api_key: str = Depends(get_api_key)):
+    try:
+        if "application/json" in request.headers.get("content-type", ""):
+            records = await request.json()
+            if not isinstance(records, list):
+                raise ValueError("expected a JSON array of interactions")
+        else:
+            body = (await request.body()).decode("utf-8")
+            records = [line for line in body.splitlines() if line.strip()]
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid bulk interaction request: {str(e)}")
+    if len(records) > INTERACTION_BULK_MAX_LINES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {INTERACTION_BULK_MAX_LINES} interactions per request"
+        )
+    
+    interactions = []
+    rejected = []
+    for line_number, record in enumerate(records, start=1):
+        try:
+            data = json.loads(record) if isinstance(record, str) else record
+            if not data.get("timestamp"):
+                data["timestamp"] = datetime.now().isoformat()
+            interactions.append(BulkInteraction(**data))
+        except (ValueError, TypeError, AttributeError, ValidationError) as e:
+            rejected.append({"line": line_number, "error": str(e)})
+    logger.info(f"Ingesting {len(interactions)} interactions ({len(rejected)} rejected)")
+    
+    try:
+        result = await run_blocking(ingest_interactions, interactions) if interactions else {
+            "applied": 0, "users_updated": 0, "unknown_users": []
+        }
+    except Exception as e:
+        logger.error(f"Error ingesting interactions: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error ingesting interactions: {str(e)}")
+    
+    return {
+        "message": f"Ingested {result['applied']} of {len(records)} interactions",
+        "received": len(records),
+        **result,
+        "rejected": rejected[:100],
+        "rejected_count": len(rejected)
+    }
+
+# Full interaction history, newest first
+@app.get("/mcp/v1/context/user/{user_id}/interactions")
+async def get_user_interactions(user_id: str, limit: int = 50, api_key: str = Depends(get_api_key)):
+    try:
+        interactions = await run_blocking(app.interaction_log.recent, user_id, max(1, min(limit, 1000)))
+        return {"user_id": user_id, "interactions": interactions}
+    except Exception as e:
+        logger.error(f"Error retrieving interactions for user {user_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving interactions: {str(e)}")
+
 # Enhanced context summary endpoint for debugging
 @app.get("/mcp/v1/context/user/{user_id}/summary")
 async def get_context_summary(user_id: str, api_key: str = Depends(get_api_key)):
@@ -640,7 +1114,8 @@ async def get_context_summary(user_id: str, api_key: str = Depends(get_api_key))
     
     try:
         # Get user context
-        user_context = get_user_context(user_id)
+        user_context = await get_user_context(user_id, with_history=True)
+        interaction_count = user_context.interaction_count or len(user_context.interaction_history)
         
         # Create a human-readable summary
         summary = {
@@ -653,7 +1128,7 @@ async def get_context_summary(user_id: str, api_key: str = Depends(get_api_key))
             },
             "inferred_preferences": user_context.inferred_tastes,
             "recent_interactions": user_context.interaction_history[-5:] if user_context.interaction_history else [],
-            "context_age": "new user" if not user_context.interaction_history else f"{len(user_context.interaction_history)} interactions recorded",
+            "context_age": "new user" if not interaction_count else f"{interaction_count} interactions recorded",
             "preference_insights": []
         }
         
@@ -0,0 +1,95 @@
+# mcp/migrate.py
+"""
+Versioned PostgreSQL schema migrations.
+
+Migrations are the .sql files in mcp/migrations, applied in file name order
+(0001_..., 0002_...). Each runs in its own transaction together with its
+row in schema_migrations, so a failed migration leaves nothing half-applied
+and is retried on the next run. An advisory lock keeps concurrently starting
+replicas from applying the same migration twice.
+
+Usage:
+    python migrate.py [--status]
+"""
+import os
+import argparse
+import logging
+from typing import List, Tuple
+
+from connections import connect_postgres
+
+logger = logging.getLogger("migrate")
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+# Arbitrary application-wide key for pg_advisory_xact_lock
+MIGRATION_LOCK_ID = 804120
+
+SCHEMA_MIGRATIONS_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+   version VARCHAR(255) PRIMARY KEY,
+   applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+def available_migrations(directory: str = MIGRATIONS_DIR) -> List[Tuple[str, str]]:
+    """
+    (version, path) for every migration file, in order; the version is the file name without .sql.
+    """
+    names = sorted(name for name in os.listdir(directory) if name.endswith(".sql"))
+    return [(name[:-len(".sql")], os.path.join(directory, name)) for name in names]
+
+def applied_versions(conn) -> List[str]:
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_MIGRATIONS_SQL)
+        cursor.execute("SELECT version FROM schema_migrations ORDER BY version")
+        versions = [row[0] for row in cursor.fetchall()]
+    conn.commit()
+    return versions
+
+def run_migrations(conn, directory: str = MIGRATIONS_DIR) -> List[str]:
+    """
+    Apply every migration not yet recorded in schema_migrations. Returns the versions applied.
+    """
+    applied = []
+    for version, path in available_migrations(directory):
+        with open(path) as f:
+            sql = f.read()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK_ID,))
+                cursor.execute(SCHEMA_MIGRATIONS_SQL)
+                # Checked under the lock: another replica may have applied it meanwhile
+                cursor.execute("SELECT 1 FROM schema_migrations WHERE version = %s", (version,))
+                if cursor.fetchone():
+                    conn.commit()
+                    continue
+                cursor.execute(sql)
+                cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        logger.info(f"Applied migration {version}")
+        applied.append(version)
+    return applied
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply PostgreSQL schema migrations")
+    parser.add_argument("--status", action="store_true", help="List migrations and whether they are applied")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    conn = connect_postgres()
+    try:
+        if args.status:
+            applied = set(applied_versions(conn))
+            for version, _ in available_migrations():
+                print(f"{'applied' if version in applied else 'pending'}  {version}")
+        else:
+            applied = run_migrations(conn)
+            logger.info(f"{len(applied)} migrations applied")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+-- mcp/migrations/0001_recommendation_indexes.sql
+-- Indexes behind the recommendation queries: dishes per restaurant,
+-- restaurant filters by cuisine/budget, and dietary tag overlap (&&).
+CREATE INDEX IF NOT EXISTS idx_dishes_restaurant_id ON dishes (restaurant_id);
+CREATE INDEX IF NOT EXISTS idx_restaurants_cuisine_price_range ON restaurants (cuisine, price_range);
+CREATE INDEX IF NOT EXISTS idx_dishes_dietary_tags ON dishes USING GIN (dietary_tags);
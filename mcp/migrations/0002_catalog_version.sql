@@ -0,0 +1,27 @@
+-- mcp/migrations/0002_catalog_version.sql
+-- Change marker for the in-memory catalog snapshot: every statement writing
+-- restaurants or dishes bumps catalog_version, so replicas detect changes by
+-- reading one row instead of hashing both tables. Catalog writes are rare,
+-- so serializing them on this row is cheap.
+CREATE TABLE IF NOT EXISTS catalog_version (
+   id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id), -- single row
+   version BIGINT NOT NULL DEFAULT 0
+);
+INSERT INTO catalog_version (id, version) VALUES (true, 0) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+BEGIN
+   UPDATE catalog_version SET version = version + 1;
+   RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS restaurants_catalog_version ON restaurants;
+CREATE TRIGGER restaurants_catalog_version
+   AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON restaurants
+   FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+DROP TRIGGER IF EXISTS dishes_catalog_version ON dishes;
+CREATE TRIGGER dishes_catalog_version
+   AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON dishes
+   FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
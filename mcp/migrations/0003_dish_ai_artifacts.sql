@@ -0,0 +1,14 @@
+-- mcp/migrations/0003_dish_ai_artifacts.sql
+-- Precomputed AI output per dish (filled by mcp/precompute.py), versioned by
+-- model and prompt-template hash. segment is the canonical dietary segment
+-- for descriptions and '' for attributes.
+CREATE TABLE IF NOT EXISTS dish_ai_artifacts (
+   dish_id INTEGER NOT NULL REFERENCES dishes(id) ON DELETE CASCADE,
+   artifact_type VARCHAR(32) NOT NULL, -- 'description' or 'attributes'
+   segment VARCHAR(255) NOT NULL DEFAULT '',
+   model VARCHAR(255) NOT NULL,
+   prompt_hash VARCHAR(64) NOT NULL,
+   value JSONB NOT NULL,
+   created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+   PRIMARY KEY (dish_id, artifact_type, segment, model, prompt_hash)
+);
@@ -0,0 +1,56 @@
+# mcp/offload.py
+import os
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Number of worker threads used for blocking work (pymongo, psycopg2, requests).
+# Keeping the pool bounded stops a burst of slow AI calls from spawning
+# unlimited threads or starving the database calls.
+BLOCKING_WORKERS = int(os.getenv("MCP_BLOCKING_WORKERS", "32"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Return the shared thread pool used to run blocking calls, creating it on first use.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=BLOCKING_WORKERS,
+            thread_name_prefix="mcp-blocking"
+        )
+        logger.info(f"Started blocking offload pool with {BLOCKING_WORKERS} workers")
+    return _executor
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking function in the shared thread pool and await its result,
+    so the event loop keeps serving other requests in the meantime.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(), call)
+
+async def run_blocking_bounded(limiter: asyncio.Semaphore, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Like run_blocking, but waits for a slot on the given semaphore first so a
+    single request can cap how many of its calls are in flight at once.
+    """
+    async with limiter:
+        return await run_blocking(func, *args, **kwargs)
+
+def shutdown_executor():
+    """
+    Shut down the shared thread pool (called on application shutdown).
+    """
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+        logger.info("Stopped blocking offload pool")
@@ -0,0 +1,155 @@
+# mcp/pg_pool.py
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+logger = logging.getLogger(__name__)
+
+class PoolTimeout(Exception):
+    """
+    Raised when no PostgreSQL connection became available within the acquisition timeout.
+    """
+
+class PostgresPool:
+    """
+    Thread-safe PostgreSQL connection pool with an acquisition timeout,
+    health checking of idle connections and usage statistics.
+    """
+
+    def __init__(
+        self,
+        minconn: int = 1,
+        maxconn: int = 10,
+        acquire_timeout: float = 5.0,
+        idle_check_after: float = 30.0,
+        **connect_kwargs
+    ):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.acquire_timeout = acquire_timeout
+        self.idle_check_after = idle_check_after
+        self.connect_kwargs = connect_kwargs
+
+        self._pool: Optional[pg_pool.ThreadedConnectionPool] = None
+        self._lock = threading.Lock()
+        # Caps checkouts at maxconn so callers wait instead of hitting "pool exhausted"
+        self._slots = threading.BoundedSemaphore(maxconn)
+        # When each pooled connection was last returned, keyed by id(conn)
+        self._last_used: Dict[int, float] = {}
+
+        # Counters exposed through stats()
+        self._acquired = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._in_use = 0
+        self._wait_seconds = 0.0
+
+    def _get_pool(self) -> pg_pool.ThreadedConnectionPool:
+        # Open lazily so the service can start before PostgreSQL is reachable
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = pg_pool.ThreadedConnectionPool(
+                        self.minconn, self.maxconn, **self.connect_kwargs
+                    )
+                    logger.info(f"Opened PostgreSQL pool (min={self.minconn}, max={self.maxconn})")
+        return self._pool
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.idle_check_after:
+            return True
+        # Connection sat idle long enough that the server or a proxy may have dropped it
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            logger.warning(f"Discarding unhealthy idle PostgreSQL connection: {e}")
+            return False
+
+    def getconn(self):
+        """
+        Check a connection out of the pool, waiting up to acquire_timeout for a free slot.
+        """
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeout(f"No PostgreSQL connection available after {self.acquire_timeout}s")
+
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+            while not self._is_healthy(conn):
+                self._last_used.pop(id(conn), None)
+                pool.putconn(conn, close=True)
+                with self._lock:
+                    self._discarded += 1
+                conn = pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._acquired += 1
+            self._in_use += 1
+            self._wait_seconds += time.monotonic() - started
+        return conn
+
+    def putconn(self, conn):
+        """
+        Return a connection to the pool; broken connections are closed instead of reused.
+        """
+        close = bool(conn.closed)
+        try:
+            if close:
+                self._last_used.pop(id(conn), None)
+                with self._lock:
+                    self._discarded += 1
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+            self._get_pool().putconn(conn, close=close)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def closeall(self):
+        """
+        Close every pooled connection (called on application shutdown).
+        """
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+            self._last_used.clear()
+
+    def stats(self) -> Dict:
+        """
+        Return pool size and usage counters for the health endpoint.
+        """
+        with self._lock:
+            open_connections = 0
+            idle = 0
+            if self._pool is not None:
+                idle = len(self._pool._pool)
+                open_connections = idle + len(self._pool._used)
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "open_connections": open_connections,
+                "idle_connections": idle,
+                "in_use": self._in_use,
+                "acquired_total": self._acquired,
+                "acquire_timeouts": self._timeouts,
+                "discarded_connections": self._discarded,
+                "avg_acquire_wait_ms": round(1000 * self._wait_seconds / self._acquired, 3) if self._acquired else 0.0
+            }
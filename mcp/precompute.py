@@ -0,0 +1,122 @@
+# mcp/precompute.py
+"""
+Offline precomputation of AI dish artifacts.
+
+Walks the dish catalog, classifies attributes per dish and generates
+descriptions per dietary segment, and stores them in dish_ai_artifacts keyed
+by dish id, model and prompt-template hash. Only missing artifacts for the
+current model/prompt version are computed, so rerunning after a model or
+prompt change recomputes just what changed.
+
+Usage:
+    python precompute.py [--only attributes|descriptions] [--segment vegan,gluten-free ...]
+                         [--workers 4] [--force]
+"""
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Set
+
+from psycopg2.extras import RealDictCursor
+
+from connections import connect_postgres
+import ai_models
+from artifacts import existing_artifact_keys, save_dish_artifact
+from migrate import run_migrations
+
+logger = logging.getLogger("precompute")
+
+def load_catalog(conn) -> List[Dict]:
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(
+            "SELECT d.id, d.name, d.description, d.dietary_tags, r.cuisine "
+            "FROM dishes d JOIN restaurants r ON d.restaurant_id = r.id ORDER BY d.id"
+        )
+        return cursor.fetchall()
+
+def catalog_segments(dishes: List[Dict], extra_segments: List[str]) -> List[str]:
+    """
+    Dietary segments to precompute: any diet, every single catalog tag, plus any given explicitly.
+    """
+    segments: Set[str] = {""}
+    for dish in dishes:
+        for tag in dish["dietary_tags"] or []:
+            segments.add(ai_models.dietary_segment([tag]))
+    for segment in extra_segments:
+        segments.add(ai_models.dietary_segment(segment.split(",")))
+    return sorted(segments)
+
+def compute_attributes(dish: Dict) -> Optional[List[str]]:
+    # Only store real model output, never the keyword fallback
+    attributes = ai_models.zero_shot_dish_attributes(dish["name"], dish["description"] or "")
+    return attributes or None
+
+def compute_description(dish: Dict, segment: str) -> Optional[str]:
+    restrictions = segment.split(",") if segment else []
+    prompt = ai_models.build_description_prompt(dish["name"], dish["cuisine"], restrictions)
+    text = ai_models.query_fireworks_ai(prompt)
+    return text if text and len(text) > 20 else None
+
+def run(only: Optional[str], extra_segments: List[str], workers: int, force: bool) -> Dict[str, int]:
+    conn = connect_postgres()
+    try:
+        # Creates dish_ai_artifacts (migrations/0003) when the service has not applied it yet
+        run_migrations(conn)
+        dishes = load_catalog(conn)
+        logger.info(f"Loaded {len(dishes)} dishes")
+
+        # Build the list of (artifact_type, dish, segment) jobs that are missing at the current version
+        jobs = []
+        if only in (None, "attributes"):
+            version = ai_models.artifact_version("attributes")
+            done = set() if force else existing_artifact_keys(conn, "attributes", version)
+            jobs += [("attributes", dish, "") for dish in dishes if (dish["id"], "") not in done]
+        if only in (None, "descriptions"):
+            version = ai_models.artifact_version("description")
+            done = set() if force else existing_artifact_keys(conn, "description", version)
+            for segment in catalog_segments(dishes, extra_segments):
+                jobs += [("description", dish, segment) for dish in dishes if (dish["id"], segment) not in done]
+        logger.info(f"{len(jobs)} artifacts to compute")
+
+        counts = {"computed": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {}
+            for artifact_type, dish, segment in jobs:
+                if artifact_type == "attributes":
+                    future = executor.submit(compute_attributes, dish)
+                else:
+                    future = executor.submit(compute_description, dish, segment)
+                futures[future] = (artifact_type, dish, segment)
+            # Results are written from this thread only, over the single connection
+            for future in as_completed(futures):
+                artifact_type, dish, segment = futures[future]
+                try:
+                    value = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to compute {artifact_type} for dish {dish['id']}: {e}")
+                    value = None
+                if value is None:
+                    counts["failed"] += 1
+                    continue
+                save_dish_artifact(conn, dish["id"], artifact_type, segment, ai_models.artifact_version(artifact_type), value)
+                conn.commit()
+                counts["computed"] += 1
+
+        logger.info(f"Precompute finished: {counts}")
+        return counts
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute AI dish attributes and descriptions")
+    parser.add_argument("--only", choices=["attributes", "descriptions"], help="Compute only one artifact type")
+    parser.add_argument("--segment", action="append", default=[], help="Extra dietary segment, e.g. vegan,gluten-free")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent model calls")
+    parser.add_argument("--force", action="store_true", help="Recompute artifacts that already exist")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    run(args.only, args.segment, args.workers, args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# mcp/provider_client.py
+import threading
+import logging
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+class ProviderClient:
+    """
+    Shared HTTP client for the AI model providers.
+
+    Keeps one keep-alive requests.Session per provider host, each with its own
+    connection pool size, so repeated calls reuse TCP/TLS connections instead
+    of paying DNS + handshake costs every time. Safe to use from the offload
+    thread pool.
+    """
+
+    def __init__(self, default_pool_size: int = 10, host_pool_sizes: Optional[Dict[str, int]] = None):
+        self.default_pool_size = default_pool_size
+        self.host_pool_sizes = host_pool_sizes or {}
+        self._sessions: Dict[str, requests.Session] = {}
+        self._request_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _session_for(self, host: str) -> requests.Session:
+        session = self._sessions.get(host)
+        if session is not None:
+            return session
+        with self._lock:
+            if host not in self._sessions:
+                pool_size = self.host_pool_sizes.get(host, self.default_pool_size)
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+                self._request_counts[host] = 0
+                logger.info(f"Opened provider session for {host} (pool size {pool_size})")
+            return self._sessions[host]
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        POST to a provider URL over the pooled session for its host.
+        """
+        host = urlparse(url).netloc
+        session = self._session_for(host)
+        with self._lock:
+            self._request_counts[host] += 1
+        return session.post(url, **kwargs)
+
+    def stats(self) -> Dict:
+        """
+        Return per-host request counts and how many of them reused a pooled connection.
+        """
+        with self._lock:
+            hosts = dict(self._request_counts)
+        result = {}
+        for host, request_count in hosts.items():
+            opened = 0
+            adapter = self._sessions[host].get_adapter(f"https://{host}")
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+            reused = max(0, request_count - opened)
+            result[host] = {
+                "pool_size": self.host_pool_sizes.get(host, self.default_pool_size),
+                "requests": request_count,
+                "connections_opened": opened,
+                "connections_reused": reused,
+                "reuse_ratio": round(reused / request_count, 3) if request_count else 0.0
+            }
+        return result
+
+    def close(self):
+        """
+        Close every provider session and its pooled connections.
+        """
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._request_counts.clear()
+
+def parse_host_pool_sizes(value: str) -> Dict[str, int]:
+    """
+    Parse "host=size,host=size" (e.g. from an environment variable) into a dict.
+    """
+    sizes = {}
+    for item in value.split(","):
+        if "=" in item:
+            host, size = item.split("=", 1)
+            try:
+                sizes[host.strip()] = int(size)
+            except ValueError:
+                logger.warning(f"Ignoring invalid provider pool size: {item}")
+    return sizes
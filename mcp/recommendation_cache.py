@@ -0,0 +1,82 @@
+# mcp/recommendation_cache.py
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from cache import ResponseCache
+
+class ContextVersions:
+    """
+    In-memory map of user id -> context_version, so a request can be matched
+    against cached results and ETags before touching MongoDB.
+
+    Versions recorded by this process are exact; entries older than max_age
+    are treated as unknown so changes made through another replica are
+    picked up within max_age seconds.
+    """
+
+    def __init__(self, max_age: float = 10.0, max_entries: int = 100000):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._versions: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[int]:
+        with self._lock:
+            entry = self._versions.get(user_id)
+        if entry is None or time.monotonic() - entry[1] > self.max_age:
+            return None
+        return entry[0]
+
+    def set(self, user_id: str, version: int):
+        with self._lock:
+            current = self._versions.get(user_id)
+            # Never move backwards if an older read finishes after a newer write
+            if current is not None and current[0] > version and time.monotonic() - current[1] <= self.max_age:
+                return
+            if len(self._versions) >= self.max_entries and user_id not in self._versions:
+                self._versions.clear()
+            self._versions[user_id] = (version, time.monotonic())
+
+    def forget(self, user_id: str):
+        with self._lock:
+            self._versions.pop(user_id, None)
+
+class RecommendationCache:
+    """
+    Cached recommendation responses keyed by user id, context version and
+    excluded items, with a matching ETag per key.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 300.0, max_bytes: int = 64 * 1024 * 1024):
+        self._cache = ResponseCache(max_entries=max_entries, max_bytes=max_bytes, ttls={"recommendations": ttl})
+
+    @staticmethod
+    def key(user_id: str, context_version: int, excluded_ids: List[str], catalog_version: str = "") -> str:
+        return f"{user_id}|{context_version}|{catalog_version}|{','.join(sorted(set(excluded_ids)))}"
+
+    @staticmethod
+    def etag(key: str) -> str:
+        # Weak: equal keys mean equivalent recommendations, not byte-identical bodies
+        return f'W/"rec-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]}"'
+
+    @staticmethod
+    def matches(if_none_match: Optional[str], etag: str) -> bool:
+        """
+        True if an If-None-Match header value covers etag.
+        """
+        if not if_none_match:
+            return False
+        # If-None-Match uses weak comparison, so W/ prefixes are ignored
+        candidates = [value.strip().replace("W/", "", 1) for value in if_none_match.split(",")]
+        return "*" in candidates or etag.replace("W/", "", 1) in candidates
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self._cache.get("recommendations", key)
+
+    def set(self, key: str, response: Dict):
+        self._cache.set("recommendations", key, response)
+
+    def stats(self) -> Dict:
+        return self._cache.stats()
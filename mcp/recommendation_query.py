@@ -0,0 +1,130 @@
+# mcp/recommendation_query.py
+"""
+Candidate restaurants and dishes for a user in one PostgreSQL round-trip.
+
+The restaurant filters, the unfiltered fallback, dietary/exclusion filtering
+and the "not enough dishes" top-up are all tiers of a single statement;
+restaurants and dishes come back as two JSON arrays in one row.
+"""
+from typing import Dict, List, Optional
+
+# {where} is the only dynamic part (cuisine/budget filters), so each filter shape is one stable statement
+RECOMMENDATION_QUERY = """
+WITH filtered AS (
+    SELECT r.id, r.name, r.cuisine, r.description, r.price_range, r.location,
+           coalesce(array_position(%(liked_cuisines)s::text[], r.cuisine::text), 999) AS rank
+    FROM restaurants r
+    {where}
+    ORDER BY rank, r.id
+    LIMIT %(restaurant_limit)s
+),
+fallback AS (
+    -- No restaurant passed the filters: take some without them
+    SELECT r.id, r.name, r.cuisine, r.description, r.price_range, r.location, 999 AS rank
+    FROM restaurants r
+    WHERE NOT EXISTS (SELECT 1 FROM filtered)
+    ORDER BY r.id
+    LIMIT 10
+),
+picked AS (
+    SELECT * FROM filtered
+    UNION ALL
+    SELECT * FROM fallback
+),
+eligible AS (
+    SELECT d.id, d.restaurant_id, d.name, d.description, d.price, d.dietary_tags,
+           coalesce(cardinality(%(dietary)s::text[]) = 0 OR d.dietary_tags && %(dietary)s::text[], false) AS matches
+    FROM dishes d
+    WHERE d.restaurant_id IN (SELECT id FROM picked)
+      AND d.id <> ALL(%(excluded)s::int[])
+),
+matching AS (
+    SELECT eligible.*, 0 AS tier FROM eligible
+    WHERE matches
+    ORDER BY id
+    LIMIT %(dish_limit)s
+),
+chosen AS (
+    SELECT * FROM matching
+    UNION ALL
+    -- Too few matching dishes: top up with other dishes of the same restaurants
+    (SELECT eligible.*, 1 AS tier FROM eligible
+     WHERE NOT matches AND (SELECT count(*) FROM matching) < 10
+     ORDER BY id
+     LIMIT 10)
+)
+SELECT
+    NOT EXISTS (SELECT 1 FROM filtered) AS used_fallback,
+    EXISTS (SELECT 1 FROM chosen WHERE tier = 1) AS topped_up,
+    (SELECT coalesce(json_agg(json_build_object(
+        'id', p.id, 'name', p.name, 'cuisine', p.cuisine, 'description', p.description,
+        'price_range', p.price_range, 'location', p.location
+     ) ORDER BY p.rank, p.id), '[]'::json) FROM picked p) AS restaurants,
+    (SELECT coalesce(json_agg(json_build_object(
+        'id', c.id, 'restaurant_id', c.restaurant_id, 'name', c.name, 'description', c.description,
+        'price', c.price, 'dietary_tags', c.dietary_tags
+     ) ORDER BY c.tier, c.id), '[]'::json) FROM chosen c) AS dishes
+"""
+
+def build_recommendation_query(
+    cuisine_preferences: List[str],
+    budget: Optional[str],
+    dietary_restrictions: List[str],
+    inferred_tastes: Dict[str, float],
+    excluded_ids: List[str],
+    restaurant_limit: int = 15,
+    dish_limit: int = 50
+):
+    """
+    (sql, params) for RECOMMENDATION_QUERY, returning at most restaurant_limit
+    filtered restaurants and dish_limit matching dishes (plus the top-up).
+    """
+    filters = []
+    if cuisine_preferences:
+        filters.append("r.cuisine = ANY(%(cuisines)s)")
+    if budget:
+        filters.append("r.price_range = %(budget)s")
+    # Restaurants of liked cuisines first, only when other filters apply
+    liked_cuisines = [
+        taste.replace("cuisine_", "").title()
+        for taste, value in inferred_tastes.items()
+        if taste.startswith("cuisine_") and value > 0.6
+    ] if filters else []
+    params = {
+        "cuisines": list(cuisine_preferences),
+        "budget": budget,
+        "liked_cuisines": liked_cuisines,
+        "dietary": list(dietary_restrictions),
+        # Excluded ids arrive as strings; only numeric ones can match a dish id
+        "excluded": [int(item) for item in excluded_ids if item.lstrip("-").isdigit()],
+        "restaurant_limit": restaurant_limit,
+        "dish_limit": dish_limit
+    }
+    where = "WHERE " + " AND ".join(filters) if filters else ""
+    return RECOMMENDATION_QUERY.format(where=where), params
+
+def fetch_recommendation_candidates(
+    cursor,
+    cuisine_preferences: List[str],
+    budget: Optional[str],
+    dietary_restrictions: List[str],
+    inferred_tastes: Dict[str, float],
+    excluded_ids: List[str],
+    restaurant_limit: int = 15,
+    dish_limit: int = 50
+) -> Dict:
+    """
+    Run the query on a (RealDict) cursor. Returns {"used_fallback", "topped_up", "restaurants", "dishes"}
+    with restaurants and dishes as lists of plain dicts.
+    """
+    sql, params = build_recommendation_query(
+        cuisine_preferences, budget, dietary_restrictions, inferred_tastes, excluded_ids, restaurant_limit, dish_limit
+    )
+    cursor.execute(sql, params)
+    row = cursor.fetchone()
+    return {
+        "used_fallback": row["used_fallback"],
+        "topped_up": row["topped_up"],
+        "restaurants": row["restaurants"],
+        "dishes": row["dishes"]
+    }
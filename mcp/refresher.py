@@ -0,0 +1,100 @@
+# mcp/refresher.py
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+class BackgroundRefresher:
+    """
+    Small worker pool that recomputes cached AI results off the request path.
+
+    Each job covers one or more cache keys. A key that is already queued or
+    being refreshed is not claimed again, so a popular stale entry triggers a
+    single refresh. Jobs beyond max_pending are dropped; the next request for
+    the key simply schedules it again.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 1000):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+        self._scheduled = 0
+        self._completed = 0
+        self._failed = 0
+        self._dropped = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mcp-refresh")
+            logger.info(f"Started background refresh pool with {self.max_workers} workers")
+        return self._executor
+
+    def claim(self, keys: List[str]) -> List[str]:
+        """
+        Mark keys as being refreshed and return the ones that were not already pending.
+        Returns [] (claiming nothing) when the pending limit is reached.
+        """
+        with self._lock:
+            claimed = [key for key in dict.fromkeys(keys) if key not in self._pending]
+            if len(self._pending) + len(claimed) > self.max_pending:
+                self._dropped += 1
+                return []
+            self._pending.update(claimed)
+            return claimed
+
+    def run(self, keys: List[str], func: Callable[..., Any], *args, **kwargs):
+        """
+        Run func(*args, **kwargs) in the background for previously claimed keys,
+        releasing them once it finishes.
+        """
+        def job():
+            try:
+                func(*args, **kwargs)
+                with self._lock:
+                    self._completed += 1
+            except Exception as e:
+                with self._lock:
+                    self._failed += 1
+                logger.error(f"Background refresh of {len(keys)} key(s) failed: {e}")
+            finally:
+                with self._lock:
+                    self._pending.difference_update(keys)
+
+        with self._lock:
+            self._scheduled += 1
+        try:
+            self._get_executor().submit(job)
+        except RuntimeError:
+            # Pool already shut down
+            with self._lock:
+                self._pending.difference_update(keys)
+
+    def submit(self, key: str, func: Callable[..., Any], *args, **kwargs) -> bool:
+        """
+        Refresh a single key in the background unless it is already pending.
+        """
+        if not self.claim([key]):
+            return False
+        self.run([key], func, *args, **kwargs)
+        return True
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            logger.info("Stopped background refresh pool")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "scheduled": self._scheduled,
+                "completed": self._completed,
+                "failed": self._failed,
+                "dropped": self._dropped
+            }
@@ -0,0 +1,157 @@
+# mcp/scoring.py
+import os
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Weight of a learned taste per unit away from neutral (inferred_tastes start at 0.5)
+SCORING_TASTE_WEIGHT = float(os.getenv("SCORING_TASTE_WEIGHT", "2.0"))
+# Weights of explicit preferences from the user's profile
+SCORING_CUISINE_PREFERENCE_WEIGHT = float(os.getenv("SCORING_CUISINE_PREFERENCE_WEIGHT", "1.0"))
+SCORING_DIETARY_WEIGHT = float(os.getenv("SCORING_DIETARY_WEIGHT", "1.0"))
+SCORING_BUDGET_WEIGHT = float(os.getenv("SCORING_BUDGET_WEIGHT", "0.5"))
+
+def cuisine_feature(cuisine: str) -> str:
+    return f"cuisine_{cuisine.lower()}"
+
+def dietary_feature(tag: str) -> str:
+    # Same key apply_interaction uses for learned dietary tastes
+    return f"prefers_{tag.replace('-', '_')}"
+
+def price_feature(price_range: str) -> str:
+    return f"price_{price_range}"
+
+class CatalogScorer:
+    """
+    Feature matrices for every restaurant and dish in a catalog snapshot.
+
+    Features are named like the inferred_tastes keys (cuisine_*, prefers_*)
+    plus price_*, so a user's tastes and explicit preferences map directly to
+    a weight vector, and scoring the whole catalog is one matrix-vector
+    product per item type.
+    """
+
+    def __init__(self, restaurants, dishes):
+        names = sorted(
+            {cuisine_feature(r.cuisine) for r in restaurants}
+            | {price_feature(r.price_range) for r in restaurants}
+            | {dietary_feature(tag) for d in dishes for tag in d.dietary_tags}
+        )
+        self.feature_names: List[str] = names
+        self.feature_index: Dict[str, int] = {name: i for i, name in enumerate(names)}
+
+        restaurant_position = {r.id: position for position, r in enumerate(restaurants)}
+        self.dish_features = np.zeros((len(dishes), len(names)), dtype=np.float32)
+        tag_totals = np.zeros((len(restaurants), len(names)), dtype=np.float32)
+        dish_counts = np.zeros(len(restaurants), dtype=np.float32)
+        for row, dish in enumerate(dishes):
+            for tag in dish.dietary_tags:
+                self.dish_features[row, self.feature_index[dietary_feature(tag)]] = 1.0
+            position = restaurant_position.get(dish.restaurant_id)
+            if position is not None:
+                restaurant = restaurants[position]
+                self.dish_features[row, self.feature_index[cuisine_feature(restaurant.cuisine)]] = 1.0
+                self.dish_features[row, self.feature_index[price_feature(restaurant.price_range)]] = 1.0
+                tag_totals[position] += self.dish_features[row]
+                dish_counts[position] += 1
+
+        # Restaurants: their own cuisine and price, plus the share of their dishes carrying each dietary tag
+        self.restaurant_features = np.zeros((len(restaurants), len(names)), dtype=np.float32)
+        np.divide(tag_totals, dish_counts[:, None], out=self.restaurant_features, where=dish_counts[:, None] > 0)
+        for row, restaurant in enumerate(restaurants):
+            self.restaurant_features[row, self.feature_index[cuisine_feature(restaurant.cuisine)]] = 1.0
+            self.restaurant_features[row, self.feature_index[price_feature(restaurant.price_range)]] = 1.0
+
+    def user_weights(self, inferred_tastes: Dict[str, float], cuisine_preferences: List[str], dietary_restrictions: List[str], budget: Optional[str]) -> np.ndarray:
+        """
+        Weight vector over the catalog features for one user.
+        """
+        weights = np.zeros(len(self.feature_names), dtype=np.float32)
+        for taste, value in inferred_tastes.items():
+            column = self.feature_index.get(taste)
+            if column is not None:
+                weights[column] += SCORING_TASTE_WEIGHT * (value - 0.5)
+        for cuisine in cuisine_preferences:
+            column = self.feature_index.get(cuisine_feature(cuisine))
+            if column is not None:
+                weights[column] += SCORING_CUISINE_PREFERENCE_WEIGHT
+        for tag in dietary_restrictions:
+            column = self.feature_index.get(dietary_feature(tag))
+            if column is not None:
+                weights[column] += SCORING_DIETARY_WEIGHT
+        if budget:
+            column = self.feature_index.get(price_feature(budget))
+            if column is not None:
+                weights[column] += SCORING_BUDGET_WEIGHT
+        return weights
+
+    def user_weight_matrix(self, contexts: List[Dict]) -> np.ndarray:
+        """
+        Weight vectors for many users (raw user_contexts documents), one row per user.
+        """
+        weights = np.zeros((len(contexts), len(self.feature_names)), dtype=np.float32)
+        for row, context in enumerate(contexts):
+            preferences = context.get("preferences") or {}
+            weights[row] = self.user_weights(
+                context.get("inferred_tastes") or {},
+                preferences.get("cuisine_preferences") or [],
+                preferences.get("dietary_restrictions") or [],
+                preferences.get("budget")
+            )
+        return weights
+
+def top_k(scores: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k highest-scoring candidates (boolean mask), best first;
+    ties keep catalog (id) order. Uses argpartition, so cost is linear in the
+    number of candidates rather than a full sort.
+    """
+    positions = np.flatnonzero(candidates)
+    if k <= 0 or not len(positions):
+        return positions[:0]
+    if len(positions) > k:
+        positions = np.sort(positions[np.argpartition(-scores[positions], k - 1)[:k]])
+    return positions[np.lexsort((positions, -scores[positions]))]
+
+def select_positions(
+    index,
+    preferences: Dict,
+    restaurant_scores: np.ndarray,
+    dish_scores: np.ndarray,
+    excluded_ids: Iterable[str],
+    restaurant_limit: int,
+    dish_limit: int
+) -> Tuple[np.ndarray, List[int]]:
+    """
+    Restaurant and dish positions to recommend, given one user's preferences
+    and scores: the top restaurants passing the cuisine/budget filters, then
+    the top dishes of those restaurants matching dietary restrictions.
+    """
+    cuisines = preferences.get("cuisine_preferences") or []
+    budget = preferences.get("budget")
+    dietary_restrictions = preferences.get("dietary_restrictions") or []
+    has_filters = bool(cuisines or budget)
+    candidates = index.restaurant_mask(cuisines, [budget] if budget else None)
+    selected = top_k(restaurant_scores, candidates, restaurant_limit)
+    
+    # If we got no results with filters, try again without filters
+    if not len(selected) and has_filters:
+        logger.info("No matching restaurants with filters, trying without filters")
+        selected = top_k(restaurant_scores, np.ones(index.restaurant_count, dtype=bool), 10)
+    
+    # Dishes of the selected restaurants, excluding disliked ones and matching dietary restrictions
+    selected_mask = np.zeros(index.restaurant_count, dtype=bool)
+    selected_mask[selected] = True
+    restaurant_dishes = index.dish_mask(selected_mask)
+    allowed = index.dish_mask(excluded_ids=excluded_ids)
+    matching = restaurant_dishes & allowed & index.dish_mask(dietary_tags=dietary_restrictions)
+    dish_positions = list(top_k(dish_scores, matching, dish_limit))
+    
+    # Ensure we have enough dishes
+    if len(dish_positions) < 10 and len(selected):
+        logger.info("Not enough dishes with exclusions, adding more options")
+        dish_positions += list(top_k(dish_scores, restaurant_dishes & allowed & ~matching, 10))
+    return selected, dish_positions
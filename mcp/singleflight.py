@@ -0,0 +1,96 @@
+# mcp/singleflight.py
+import threading
+import logging
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+    def wait(self, timeout: float = None) -> Any:
+        """
+        Block until the leader finishes and return its result (or re-raise its error).
+        """
+        if not self.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for in-flight call")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key (the leader) runs the computation; callers that
+    arrive while it is in flight wait for and share its result instead of
+    repeating the work. Keys are "<kind>:<id>", and collapsed calls are
+    counted per kind.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._collapsed: Dict[str, int] = {}
+
+    def begin(self, key: str) -> Tuple[_Call, bool]:
+        """
+        Join the in-flight call for key, or start one. Returns (call, is_leader);
+        a leader must call finish(key, ...) exactly once.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                kind = key.split(":", 1)[0]
+                self._collapsed[kind] = self._collapsed.get(kind, 0) + 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self._leaders += 1
+            return call, True
+
+    def finish(self, key: str, result: Any = None, error: BaseException = None):
+        """
+        Publish the leader's result (or error) to every waiter and retire the key.
+        """
+        with self._lock:
+            call = self._calls.pop(key, None)
+        if call is None:
+            return
+        call.result = result
+        call.error = error
+        call.done.set()
+        if call.waiters:
+            logger.info(f"Shared one result for {key.split(':', 1)[0]} with {call.waiters} concurrent caller(s)")
+
+    def do(self, key: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run func(*args, **kwargs) once per key at a time and return its result to every concurrent caller.
+        """
+        call, leader = self.begin(key)
+        if not leader:
+            return call.wait()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executed": self._leaders,
+                "collapsed": sum(self._collapsed.values()),
+                "collapsed_by_kind": dict(self._collapsed)
+            }
@@ -0,0 +1,39 @@
+# mcp/test_keyword_rules.py
+import keyword_rules
+from keyword_rules import (
+    ATTRIBUTE_MATCHER, DISH_NAME_MATCHER, DISH_NAME_RULES, GENERIC_NAME_MATCHER, GENERIC_NAME_RULES,
+    SENTIMENT_MATCHER, first_rule_attributes
+)
+
+def test_inflected_positive_feedback():
+    hits = SENTIMENT_MATCHER.find_all("I loved it and really enjoyed the dishes")
+    assert hits == {"positive": ["love", "enjoy"]}
+
+def test_inflected_negative_feedback():
+    assert SENTIMENT_MATCHER.find_all("Disliked it, hated the sauce") == {"negative": ["dislike", "hate"]}
+    assert SENTIMENT_MATCHER.find_all("Absolutely disappointing meal") == {"negative": ["disappointed"]}
+    assert SENTIMENT_MATCHER.find_all("Terribly bland") == {"negative": ["terrible"]}
+
+def test_plain_and_plural_forms():
+    assert SENTIMENT_MATCHER.find_all("Great food, the best!") == {"positive": ["great", "best"]}
+    assert ATTRIBUTE_MATCHER.categories("Two chilis and spicier than expected") == ["spicy"]
+    assert ATTRIBUTE_MATCHER.categories("An old-fashioned recipe") == ["traditional"]
+
+def test_terms_inside_other_words_do_not_match():
+    assert SENTIMENT_MATCHER.find_all("He wore a hat") == {}
+    assert SENTIMENT_MATCHER.find_all("Ungood") == {}
+    assert SENTIMENT_MATCHER.find_all("We said goodbye") == {}
+    assert SENTIMENT_MATCHER.find_all("A badge from the hotel") == {}
+    assert ATTRIBUTE_MATCHER.categories("Back at the hotel") == []
+
+def test_dish_names_match_by_substring():
+    assert first_rule_attributes(DISH_NAME_MATCHER, DISH_NAME_RULES, "Cheesecake") == ["sweet", "indulgent"]
+    assert first_rule_attributes(DISH_NAME_MATCHER, DISH_NAME_RULES, "Tomato Soup") == ["comforting", "warm"]
+    assert first_rule_attributes(GENERIC_NAME_MATCHER, GENERIC_NAME_RULES, "Beefsteak") == ["savory", "traditional"]
+    assert first_rule_attributes(DISH_NAME_MATCHER, DISH_NAME_RULES, "Grilled Fish") == []
+
+def test_inflections():
+    assert {"loved", "loving", "lovely"} <= set(keyword_rules.inflections("love"))
+    assert {"disappointing", "disappoints"} <= set(keyword_rules.inflections("disappointed"))
+    assert {"tastier", "tastiest"} <= set(keyword_rules.inflections("tasty"))
+    assert "goodbye" not in keyword_rules.inflections("good")